@@ -7,6 +7,11 @@ chip is connected to ESP32 via I2C bus.
 """
 
 import machine
+import micropython
+from micropython import const
+
+# Debug output (0 = off)
+DEBUG = const(0)
 
 ALS_ADDRESS = 0x53
 
@@ -51,8 +56,16 @@ ALS_GAIN_18X = 0x04
 ALS_GAIN_MASK = 0x07
 
 ALS_GAIN_FACTOR = [1, 3, 6, 9, 18]
+# Maximum ALS reading indexed by resolution (20, 19, 18, 17, 16 bit)
+ALS_MAX_VALUE = [1048575, 524287, 262143, 131071, 65535]
 ALS_INTEGRATION_FACTOR = [4, 2, 1, 0.50, 0.25]
 
+# Lux scale factor 0.45 / (gain * integration) indexed by [gain][resolution]
+ALS_LUX_SCALE = [
+    [0.45 / (gain * integration) for integration in ALS_INTEGRATION_FACTOR]
+    for gain in ALS_GAIN_FACTOR
+]
+
 ALS_STATUS_DATA_READY_MASK = 0x08
 ALS_STATUS_INTERRUPT_MASK = 0x10
 
@@ -62,6 +75,13 @@ ALS_INT_CFG_ENABLE_MASK = 0x04
 ALS_INT_PST = 0x1A
 ALS_INT_PST_MASK = 0xF0
 
+# Register values after a software reset
+ALS_CONTROL_RESET_DEFAULT = ALS_CONTROL_DISABLE
+ALS_MEAS_RES_RESET_DEFAULT = ALS_MEAS_RES_100MS | ALS_MEAS_RATE_100MS
+ALS_GAIN_RESET_DEFAULT = ALS_GAIN_3X
+ALS_INT_CFG_RESET_DEFAULT = 0x10
+ALS_INT_PST_RESET_DEFAULT = 0x00
+
 ALS_THRES_UP_0 = 0x21
 ALS_THRES_UP_1 = 0x22
 ALS_THRES_UP_2 = 0x23
@@ -71,6 +91,13 @@ ALS_THRES_LOW_2 = 0x26
 
 
 class AmbientLightSensor:
+    """
+    The configuration registers (CONTROL, MEAS_RES, GAIN, INT_CFG and INT_PST)
+    are only changed by this class, so their values are kept in shadow
+    attributes. Getters return the shadow value and setters modify the shadow
+    and write it out, avoiding an I2C read for every read-modify-write.
+    """
+
     def __init__(self, i2c: machine.I2C, address=ALS_ADDRESS):
         if isinstance(i2c, machine.I2C):
             self.i2c = i2c
@@ -80,177 +107,225 @@ class AmbientLightSensor:
             raise Exception("i2c is not an I2C object")
         self.address = address
 
-        # Set to default settings
+        # Preallocated receive buffers, reused by every read to avoid heap churn
+        self._buf_reg = bytearray(1)
+        self._buf_byte = bytearray(1)
+        self._buf_word = bytearray(3)
+
+        # Set to default settings (MEAS_RES and GAIN are adjacent registers,
+        # so they are written in a single auto-incrementing burst)
         self.i2c.writeto_mem(
             self.address, ALS_CONTROL, bytearray([ALS_CONTROL_ENABLE_MASK])
         )
-        self.i2c.writeto_mem(self.address, ALS_MEAS_RES, bytearray([ALS_MEAS_DEFAULT]))
-        self.i2c.writeto_mem(self.address, ALS_GAIN, bytearray([ALS_GAIN_3X]))
+        self.i2c.writeto_mem(
+            self.address, ALS_MEAS_RES, bytearray([ALS_MEAS_DEFAULT, ALS_GAIN_3X])
+        )
+        self._control = ALS_CONTROL_ENABLE_MASK
+        self._meas_res = ALS_MEAS_DEFAULT
+        self._gain = ALS_GAIN_3X
+
+        # Interrupt registers are left untouched, seed their shadows from the chip
+        data = bytearray(2)
+        self.read_register_into(ALS_INT_CFG, data)
+        self._int_cfg = data[0]
+        self._int_pst = data[1]
+
+        self._lux_scale = 0
+        self.update_lux_scale()
 
+    @micropython.native
+    def read_register_into(self, register, buf):
+        """
+        Read consecutive registers starting at register into buf
+
+        The register address is written without a STOP condition so the read
+        follows with a repeated START in the same transaction, regardless of
+        how the firmware implements readfrom_mem.
+
+        :param register: first register address
+        :param buf: buffer to fill, its length sets the number of bytes read
+        """
+        self._buf_reg[0] = register
+        self.i2c.writeto(self.address, self._buf_reg, False)
+        self.i2c.readfrom_into(self.address, buf)
+
+    @micropython.native
     def read(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_DATA_0, 3)
-        return data[0] | (data[1] << 8) | (data[2] << 16)
+        data = self._buf_word
+        self.read_register_into(ALS_DATA_0, data)
+        return int.from_bytes(data, "little")
 
     def read_raw(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_DATA_0, 3)
-        return data
+        data = self._buf_word
+        self.read_register_into(ALS_DATA_0, data)
+        return bytes(data)
 
     def read_raw_0(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_DATA_0, 1)
+        data = self._buf_byte
+        self.read_register_into(ALS_DATA_0, data)
         return data[0]
 
     def read_raw_1(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_DATA_1, 1)
+        data = self._buf_byte
+        self.read_register_into(ALS_DATA_1, data)
         return data[0]
 
     def read_raw_2(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_DATA_2, 1)
+        data = self._buf_byte
+        self.read_register_into(ALS_DATA_2, data)
         return data[0]
 
     def read_status(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_STATUS, 1)
+        data = self._buf_byte
+        self.read_register_into(ALS_STATUS, data)
         return data[0]
 
+    def poll_status(self):
+        """
+        Read the status register once and decode it
+
+        Returns:
+            Tuple of (status byte, data ready flag, interrupt flag)
+        """
+        status = self.read_status()
+        return (
+            status,
+            True if status & ALS_STATUS_DATA_READY_MASK else False,
+            True if status & ALS_STATUS_INTERRUPT_MASK else False,
+        )
+
     def read_status_data_ready(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_STATUS, 1)
-        return True if data[0] & ALS_STATUS_DATA_READY_MASK else False
+        return self.poll_status()[1]
 
     def read_status_interrupt(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_STATUS, 1)
-        return True if data[0] & ALS_STATUS_INTERRUPT_MASK else False
+        return self.poll_status()[2]
 
     def read_control(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_CONTROL, 1)
-        return data[0]
+        return self._control
 
     def is_enabled(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_CONTROL, 1)
-        return True if data[0] & ALS_CONTROL_ENABLE_MASK else False
+        return True if self._control & ALS_CONTROL_ENABLE_MASK else False
 
     def enable(self):
-        self.i2c.writeto_mem(
-            self.address, ALS_CONTROL, bytearray([ALS_CONTROL_ENABLE_MASK])
-        )
+        self._control = ALS_CONTROL_ENABLE_MASK
+        self.i2c.writeto_mem(self.address, ALS_CONTROL, bytearray([self._control]))
 
     def disable(self):
-        self.i2c.writeto_mem(
-            self.address, ALS_CONTROL, bytearray([ALS_CONTROL_DISABLE])
-        )
+        self._control = ALS_CONTROL_DISABLE
+        self.i2c.writeto_mem(self.address, ALS_CONTROL, bytearray([self._control]))
 
     def reset(self):
         self.i2c.writeto_mem(
             self.address, ALS_CONTROL, bytearray([ALS_CONTROL_RESET_MASK])
         )
+        self._control = ALS_CONTROL_RESET_DEFAULT
+        self._meas_res = ALS_MEAS_RES_RESET_DEFAULT
+        self._gain = ALS_GAIN_RESET_DEFAULT
+        self._int_cfg = ALS_INT_CFG_RESET_DEFAULT
+        self._int_pst = ALS_INT_PST_RESET_DEFAULT
+        self.update_lux_scale()
 
     def read_measurement_resolution(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_MEAS_RES, 1)
-        return data[0] & ALS_MEAS_RES_MASK
+        return self._meas_res & ALS_MEAS_RES_MASK
 
     def set_measurement_resolution(self, resolution):
-        data = self.i2c.readfrom_mem(self.address, ALS_MEAS_RES, 1)
-        val = data[0] & ~ALS_MEAS_RES_MASK
-        val |= resolution
-        self.i2c.writeto_mem(self.address, ALS_MEAS_RES, bytearray([val]))
+        self._meas_res = (self._meas_res & ~ALS_MEAS_RES_MASK) | resolution
+        self.i2c.writeto_mem(self.address, ALS_MEAS_RES, bytearray([self._meas_res]))
+        self.update_lux_scale()
 
     def read_measurement_rate(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_MEAS_RES, 1)
-        return data[0] & ALS_MEAS_RATE_MASK
+        return self._meas_res & ALS_MEAS_RATE_MASK
 
     def set_measurement_rate(self, rate):
-        data = self.i2c.readfrom_mem(self.address, ALS_MEAS_RES, 1)
-        val = data[0] & ~ALS_MEAS_RATE_MASK
-        val |= rate
-        self.i2c.writeto_mem(self.address, ALS_MEAS_RES, bytearray([val]))
+        self._meas_res = (self._meas_res & ~ALS_MEAS_RATE_MASK) | rate
+        self.i2c.writeto_mem(self.address, ALS_MEAS_RES, bytearray([self._meas_res]))
 
     def read_gain(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_GAIN, 1)
-        return data[0]
+        return self._gain
 
     def set_gain(self, gain):
-        gain = gain & ALS_GAIN_MASK
-        self.i2c.writeto_mem(self.address, ALS_GAIN, bytearray([gain]))
+        self._gain = gain & ALS_GAIN_MASK
+        self.i2c.writeto_mem(self.address, ALS_GAIN, bytearray([self._gain]))
+        self.update_lux_scale()
 
     def is_interrupt_enabled(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_INT_CFG, 1)
-        return True if data[0] & ALS_INT_CFG_ENABLE_MASK else False
+        return True if self._int_cfg & ALS_INT_CFG_ENABLE_MASK else False
 
     def enable_interrupt(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_INT_CFG, 1)
-        val = data[0] | ALS_INT_CFG_ENABLE_MASK
-        self.i2c.writeto_mem(self.address, ALS_INT_CFG, bytearray([val]))
+        self._int_cfg |= ALS_INT_CFG_ENABLE_MASK
+        self.i2c.writeto_mem(self.address, ALS_INT_CFG, bytearray([self._int_cfg]))
 
     def disable_interrupt(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_INT_CFG, 1)
-        val = data[0] & ~ALS_INT_CFG_ENABLE_MASK
-        self.i2c.writeto_mem(self.address, ALS_INT_CFG, bytearray([val]))
+        self._int_cfg &= ~ALS_INT_CFG_ENABLE_MASK
+        self.i2c.writeto_mem(self.address, ALS_INT_CFG, bytearray([self._int_cfg]))
 
     def read_interrupt_persistence(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_INT_PST, 1)
-        return (data[0] & ALS_INT_PST_MASK) >> 4
+        return (self._int_pst & ALS_INT_PST_MASK) >> 4
 
     def set_interrupt_persistence(self, persistence):
         persistence = persistence & 0x0F
         persistence <<= 4
-        data = self.i2c.readfrom_mem(self.address, ALS_INT_PST, 1)
-        val = data[0] & ~ALS_INT_PST_MASK
-        val |= persistence
-        self.i2c.writeto_mem(self.address, ALS_INT_PST, bytearray([val]))
+        self._int_pst = (self._int_pst & ~ALS_INT_PST_MASK) | persistence
+        self.i2c.writeto_mem(self.address, ALS_INT_PST, bytearray([self._int_pst]))
 
     def read_interrupt_threshold_upper(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_THRES_UP_0, 3)
-        return data[0] | (data[1] << 8) | (data[2] << 16)
+        data = self._buf_word
+        self.read_register_into(ALS_THRES_UP_0, data)
+        return int.from_bytes(data, "little")
 
     def read_interrupt_threshold_lower(self):
-        data = self.i2c.readfrom_mem(self.address, ALS_THRES_LOW_0, 3)
-        return data[0] | (data[1] << 8) | (data[2] << 16)
+        data = self._buf_word
+        self.read_register_into(ALS_THRES_LOW_0, data)
+        return int.from_bytes(data, "little")
 
     def set_interrupt_threshold_upper(self, threshold):
-        data = bytearray(
-            [threshold & 0xFF, (threshold >> 8) & 0xFF, (threshold >> 16) & 0xFF]
-        )
+        data = (threshold & 0xFFFFFF).to_bytes(3, "little")
         self.i2c.writeto_mem(self.address, ALS_THRES_UP_0, data)
 
     def set_interrupt_threshold_lower(self, threshold):
-        data = bytearray(
-            [threshold & 0xFF, (threshold >> 8) & 0xFF, (threshold >> 16) & 0xFF]
-        )
+        data = (threshold & 0xFFFFFF).to_bytes(3, "little")
         self.i2c.writeto_mem(self.address, ALS_THRES_LOW_0, data)
 
     def adjust_interrupt_threshold_range(self, percentage):
         current_value = self.read()
-        max_value = 0xFFFFFF
         resolution = self.read_measurement_resolution() >> 4
-        if resolution == ALS_MEAS_RES_16BIT:
-            max_value = 65535
-        elif resolution == ALS_MEAS_RES_17BIT:
-            max_value = 131071
-        elif resolution == ALS_MEAS_RES_18BIT:
-            max_value = 262143
-        elif resolution == ALS_MEAS_RES_19BIT:
-            max_value = 524287
-        elif resolution == ALS_MEAS_RES_20BIT:
-            max_value = 1048575
+        if resolution < len(ALS_MAX_VALUE):
+            max_value = ALS_MAX_VALUE[resolution]
+        else:
+            max_value = 0xFFFFFF
         range_half = int((max_value * percentage / 100) / 2)
 
-        print("Current value: %d" % current_value)
-        print("Max value: %d" % max_value)
-        print("Range half: %d" % range_half)
+        if DEBUG:
+            print("Current value: %d" % current_value)
+            print("Max value: %d" % max_value)
+            print("Range half: %d" % range_half)
 
         upper = current_value + range_half
         if upper > max_value:
             upper = max_value
-        print("Upper: %d" % upper)
+        if DEBUG:
+            print("Upper: %d" % upper)
 
         lower = current_value - range_half
         if lower < 0:
             lower = 0
-        if upper > 0xFFFFFF:
-            upper = 0xFFFFFF
-        print("Lower: %d" % lower)
+        if DEBUG:
+            print("Lower: %d" % lower)
 
         self.set_interrupt_threshold_upper(upper)
         self.set_interrupt_threshold_lower(lower)
 
+    def update_lux_scale(self):
+        """
+        Recalculate the lux scale factor from the current gain and measurement
+        resolution. Called whenever either setting changes.
+
+        formula: scale = 0.45 / (ALS_GAIN * (ALS_MEAS_RES / ALS_MEAS_RATE))
+        """
+        resolution = (self._meas_res & ALS_MEAS_RES_MASK) >> 4
+        self._lux_scale = ALS_LUX_SCALE[self._gain][resolution]
+
+    @micropython.native
     def lux_calc(self):
         """
         Calculate the lux value
@@ -260,12 +335,4 @@ class AmbientLightSensor:
         Returns:
             Lux value
         """
-        als_data = self.read()
-        als_gain = self.read_gain()
-        gain = ALS_GAIN_FACTOR[als_gain]
-        als_meas_res = self.read_measurement_resolution()
-        integration = ALS_INTEGRATION_FACTOR[als_meas_res >> 4]
-
-        lux = (0.45 * als_data) / (gain * integration)
-
-        return lux
+        return self.read() * self._lux_scale
@@ -1,6 +1,7 @@
 import sys
 
 import esp32
+import gc
 import machine
 import ntptime
 import uasyncio
@@ -12,7 +13,7 @@ import wifimgr
 from primitives.queue import Queue
 from i2c_multiplex import I2CMultiplex
 from chess import Chess, algebraic_to_board_index
-from chessboard import Chessboard, INVERSE_MASK, STARTING_POSITION
+from chessboard import Chessboard, STARTING_POSITION
 from chess_clock import ChessClock
 from chessboard_led import ChessboardLED
 from micropython import const
@@ -30,15 +31,84 @@ IO_EXPANDER_1_ADDRESS = 0x21
 IO_EXPANDER_2_ADDRESS = 0x22
 IO_EXPANDER_3_ADDRESS = 0x23
 
+# Debug output (0 = off); const so mpy-cross drops the guarded prints
+DEBUG = const(0)
+
 # Game mode constants
 MODE_VS_CPU = const(0)
 MODE_VS_HUMAN = const(1)
 MODE_VS_HUMAN_REMOTE = const(2)
 
+# Maximum number of queued Nextion events handled back-to-back before the
+# event listener sleeps for a full tick
+MAX_EVENT_BURST = const(8)
+
+# Event listener tick while engine searches need regular polling, and
+# the longer ticks used otherwise when UART receive interrupts can wake it early:
+# during a game for the clock expiry checks, and outside one only for the REPL button
+EVENT_TICK_MS = const(50)
+IDLE_TICK_MS = const(250)
+MENU_TICK_MS = const(1000)
+
+# Nextion touch actions
+TOUCH_MAIN_MENU = const(1)
+TOUCH_START_VS_CPU = const(2)
+TOUCH_START_VS_HUMAN = const(3)
+TOUCH_START_VS_HUMAN_REMOTE = const(4)
+TOUCH_TEST_RGB = const(5)
+TOUCH_FIX_BOARD = const(6)
+TOUCH_FIX_BOARD_DONE = const(7)
+TOUCH_SAVE_GAME = const(8)
+TOUCH_NEW_GAME = const(9)
+TOUCH_SELECT_PROMOTION = const(10)
+TOUCH_TEST_OLED = const(11)
+TOUCH_TEST_ALS = const(12)
+TOUCH_STOP_TEST = const(13)
+TOUCH_RESIGN = const(14)
+TOUCH_ABANDON = const(15)
+
+# Maps (page, component) of a Nextion touch event to its action
+TOUCH_ACTIONS = {
+    (18, 5): TOUCH_MAIN_MENU,
+    (16, 2): TOUCH_START_VS_CPU,
+    (16, 15): TOUCH_START_VS_CPU,
+    (4, 3): TOUCH_START_VS_HUMAN,
+    (4, 5): TOUCH_START_VS_HUMAN_REMOTE,
+    (11, 4): TOUCH_TEST_RGB,
+    (5, 6): TOUCH_FIX_BOARD,
+    (6, 6): TOUCH_FIX_BOARD,
+    (7, 6): TOUCH_FIX_BOARD,
+    (14, 5): TOUCH_FIX_BOARD_DONE,
+    (18, 12): TOUCH_SAVE_GAME,
+    (18, 8): TOUCH_NEW_GAME,
+    (7, 10): TOUCH_NEW_GAME,
+    (19, 2): TOUCH_SELECT_PROMOTION,
+    (19, 7): TOUCH_SELECT_PROMOTION,
+    (19, 8): TOUCH_SELECT_PROMOTION,
+    (19, 9): TOUCH_SELECT_PROMOTION,
+    (11, 5): TOUCH_TEST_OLED,
+    (11, 6): TOUCH_TEST_ALS,
+    (12, 3): TOUCH_STOP_TEST,
+    (23, 9): TOUCH_RESIGN,
+    (23, 10): TOUCH_ABANDON,
+}
+
 # UI Buttons
 BUTTON_WHITE = 13
 BUTTON_BLACK = 12
 
+# PGN headers shared by every game of a mode; Date and Time are added per game
+CPU_GAME_HEADERS = {"White": "Human", "Black": "CPU", "Event": "Game vs CPU", "Site": "Imagine RIT"}
+HUMAN_GAME_HEADERS = {"White": "Human", "Black": "Human", "Event": "2 player game", "Site": "Imagine RIT"}
+
+# SD card sector size, PGN files are written in whole sectors
+SD_SECTOR_SIZE = const(512)
+
+# RTC date and time formats
+DATE_FORMAT = "%04d.%02d.%02d"
+TIME_FORMAT_24H = "%02d:%02d:%02d"
+TIME_FORMAT_12H = "%02d:%02d:%02d %s"
+
 # Initialization
 i2c_mux_addr = 0x70
 i2c: machine.I2C
@@ -50,9 +120,9 @@ chessboard_gpio_addr = [
     IO_EXPANDER_3_ADDRESS,
 ]
 chessboard: Chessboard
-board: dict
 board_status: int
 sd_card_mounted = False
+game_counter = None
 white_clock: ChessClock
 black_clock: ChessClock
 chessboard_led: ChessboardLED
@@ -86,6 +156,9 @@ lock = uasyncio.Lock()
 # Initialize Queue for synchronizing UART messages
 queue = Queue()
 
+# Wakes the event listener early when an IO expander or button interrupt fires
+event_flag = uasyncio.ThreadSafeFlag()
+
 # Nextion display
 tft: nextion.Nextion
 
@@ -99,17 +172,90 @@ device_id = ubinascii.hexlify(machine.unique_id())
 hopper_ticks = 0
 previous_tick = 0
 io_expander_interrupt_flag = False
+uart_rx_wakeup = False
 button_interrupt_flag = False
 button_interrupt_id = None
 light_sensor: AmbientLightSensor
 
 
+async def blink_leds(leds, tick_ms=50):
+    """
+    Blink several LEDs from a single task
+
+    :param leds: list of (led, period_ms) tuples, periods are multiples of tick_ms
+    :param tick_ms: scheduler tick shared by all LEDs
+    """
+    elapsed = 0
+    while True:
+        elapsed += tick_ms
+        for led, period_ms in leds:
+            if elapsed % period_ms == 0:
+                led.value(not led.value())
+        await uasyncio.sleep_ms(tick_ms)
+
+
 async def blink(led, period_ms):
+    await blink_leds([(led, period_ms)], tick_ms=period_ms)
+
+
+async def clock_ticker(clocks, period_ms=100):
+    """
+    Keep the running chess clocks up to date from their own task
+
+    :param clocks: list of ChessClock objects
+    :param period_ms: update period, short enough for the tenths shown in the last minute
+    """
     while True:
-        led.value(not led.value())
+        for clock in clocks:
+            if clock.is_clock_running():
+                clock.update_clock()
+                if clock.is_clock_expired():
+                    # Let the event listener handle the flag fall right away
+                    event_flag.set()
         await uasyncio.sleep_ms(period_ms)
 
 
+async def io_expander_poll(chessboard, period_ms=25):
+    """
+    Fallback for when the IO expander interrupt cannot be set up: poll the board
+    and raise the same flag as io_expander_callback when it changes
+
+    :param chessboard: Chessboard object
+    :param period_ms: time between board reads
+    """
+    global io_expander_interrupt_flag
+
+    last_status = chessboard.get_board_status()
+    while True:
+        await uasyncio.sleep_ms(period_ms)
+        chessboard.read_board()
+        status = chessboard.get_board_status()
+        if status != last_status:
+            last_status = status
+            io_expander_interrupt_flag = True
+            event_flag.set()
+
+
+async def lux_ticker(light_sensor, chessboard_led, period_ms=1000):
+    """
+    Track the ambient light level for the LED brightness from its own task
+
+    The LEDs only follow changes of more than 5% from the level last applied,
+    so slow drift and sensor noise do not cause constant brightness updates.
+
+    :param light_sensor: AmbientLightSensor object
+    :param chessboard_led: ChessboardLED object whose brightness follows the lux level
+    :param period_ms: time between sensor reads
+    """
+    applied_lux = chessboard_led.lux
+    while True:
+        await uasyncio.sleep_ms(period_ms)
+        lvl = light_sensor.lux_calc()
+        if lvl >= applied_lux * 1.05 or lvl <= applied_lux / 1.05:
+            chessboard_led.set_lux(lvl)
+            applied_lux = lvl
+
+
 async def wifi_blink(led, period_ms):
     global wlan
     global wifi_connected
@@ -140,15 +286,14 @@ async def connect_wifi():
         have_sd = True
     wlan = wifimgr.get_connection(have_sd)
 
-    while True:
-        if wlan is None:
-            pass
-        else:
-            wifi_connected = True
-            # await uasyncio.sleep_ms(200)
-            # ntptime.settime()
-            break
-        # await uasyncio.sleep_ms(200)
+    # get_connection blocks until it either connects or gives up
+    if wlan is None:
+        wifi_connected = False
+        print("could not connect to wifi")
+        return
+
+    wifi_connected = True
+    # ntptime.settime()
     print("connected to wifi")
     print(wlan.ifconfig())
 
@@ -163,46 +308,140 @@ async def console_move_history(
 ):
     global tft
 
-    print("in console_move_history")
     length_history = len(move_history)
-    print("length_history: %s" % length_history)
+    if DEBUG:
+        print("in console_move_history")
+        print("length_history: %s" % length_history)
     if length_history == 0:
-        console_buffer = "1. ..."
+        console_buffer = b"1. ..."
     else:
         side = "b" if move_history[-1][1] == "" else "w"
-        print("side: %s" % side)
-        if len(move_history) >= max_lines:
-            move_num = full_move_number - max_lines + 1
-            if side == "w":
-                max_lines -= 1
-            history = move_history[-max_lines:]
-        else:
-            move_num = 1
-            history = move_history
-        console_buffer = ""
-
-        print("move history: %s" % history)
-        print("move number: %s" % move_num)
-
-        for i, move in enumerate(history):
-            if i > 0:
-                console_buffer += "\\r"
-            if move[1] != "":
-                console_buffer += "%d. %s %s" % (move_num + i, move[0], move[1])
+        if DEBUG:
+            print("side: %s" % side)
+        if side == "w":
+            # Leave a line for the "n. ..." placeholder of the next move
+            max_lines -= 1
+        # Index the last max_lines moves in place rather than slicing a copy
+        start = max(0, length_history - max_lines)
+        # fullmove has already advanced past the last listed move once black has moved
+        last_move_num = full_move_number if side == "b" else full_move_number - 1
+        move_num = max(1, last_move_num - (length_history - start) + 1)
+
+        if DEBUG:
+            print("move history: %s" % move_history[start:])
+            print("move number: %s" % move_num)
+
+        # Collect the lines and join once instead of growing a string with +=
+        lines = []
+        append = lines.append
+        for i in range(start, length_history):
+            white_move, black_move = move_history[i]
+            if black_move != "":
+                append("%d. %s %s" % (move_num, white_move, black_move))
+            elif not game_over:
+                append("%d. %s ..." % (move_num, white_move))
             else:
-                if not game_over:
-                    console_buffer += "%d. %s ..." % (move_num + i, move[0])
-                else:
-                    console_buffer += "%d. %s" % (move_num + i, move[0])
+                append("%d. %s" % (move_num, white_move))
+            move_num += 1
         if side == "w" and not game_over:
-            console_buffer += "\\r%d. ..." % (move_num + i + 1)
+            append("%d. ..." % move_num)
         if game_over:
-            console_buffer += "\\r%s" % result
-    print("console buffer: %s" % console_buffer)
+            append(result)
+        # Move text is plain ASCII, so one encode() replaces set_value's rawbytes pass
+        console_buffer = "\\r".join(lines).encode()
+    if DEBUG:
+        print("console buffer: %s" % console_buffer)
     await tft.print_console(console_buffer, page=page, max_lines=max_lines, replace=True)
 
 
-def format_rtc_datetime(rtc: machine.RTC):
+async def wait_for_lux(light_sensor: AmbientLightSensor, above=None, below=None, period_ms=250):
+    """
+    Wait until the ambient light level reaches a threshold
+
+    The sensor's INT pin is not wired to the ESP32, so the level is sampled
+    every period_ms and the first reading past the threshold is returned.
+
+    :param light_sensor: AmbientLightSensor object
+    :param above: return once the lux value is at or above this level
+    :param below: return once the lux value is at or below this level
+    :param period_ms: time between readings
+    :return: lux value that met the threshold
+    """
+    while True:
+        lvl = light_sensor.lux_calc()
+        if (above is not None and lvl >= above) or (below is not None and lvl <= below):
+            return lvl
+        await uasyncio.sleep_ms(period_ms)
+
+
+async def oled_test(tft, white_clock: ChessClock, black_clock: ChessClock):
+    """
+    Show a character set on both OLED displays, then run each clock down from 10 seconds
+
+    Runs as its own task so the event listener keeps handling touches, and is
+    cancelled when the test page is left.
+
+    :param tft: Nextion object for the test console
+    :param white_clock: white ChessClock object
+    :param black_clock: black ChessClock object
+    :return: None
+    """
+    white_clock.clear()
+    black_clock.clear()
+    await tft.clear_console()
+    await tft.print_console("Testing white OLED display...")
+    white_clock.display_lines(["0123456789ABCDEF", "GHIJKLMNOPQRSTUVW", "XYZ!@#$%^&*(){}',."])
+    await uasyncio.sleep_ms(2000)
+    white_clock.clear()
+    await tft.print_console("Done\\rTesting black OLED display...")
+    black_clock.display_lines(["0123456789ABCDEF", "GHIJKLMNOPQRSTUVW", "XYZ!@#$%^&*(){}',."])
+    await uasyncio.sleep_ms(2000)
+    black_clock.clear()
+    await tft.print_console("Done\\rTesting white clock...")
+    # The running clock is redrawn by clock_ticker, so only wait for it to run out
+    white_clock.set_clock(10)
+    black_clock.set_clock(10)
+    white_clock.start_clock()
+    while not white_clock.is_clock_expired():
+        await uasyncio.sleep_ms(EVENT_TICK_MS)
+    await tft.print_console("Done\\rTesting black clock...")
+    black_clock.start_clock()
+    while not black_clock.is_clock_expired():
+        await uasyncio.sleep_ms(EVENT_TICK_MS)
+    white_clock.clear()
+    black_clock.clear()
+    await tft.print_console("Done\\rTesting complete")
+
+
+async def als_test(tft, light_sensor: AmbientLightSensor, clock: ChessClock):
+    """
+    Walk through the ambient light sensor range, then keep showing the lux level
+
+    Runs as its own task until it is cancelled when the test page is left.
+
+    :param tft: Nextion object for the test console
+    :param light_sensor: AmbientLightSensor object
+    :param clock: ChessClock object showing the lux level
+    :return: None
+    """
+    await tft.clear_console()
+    await tft.print_console("Shine bright light on the sensor")
+    lvl = await wait_for_lux(light_sensor, above=20000)
+    await tft.print_console("\\rLuminosity: %s" % lvl)
+    await tft.print_console("\\rCover the sensor with your finger")
+    lvl = await wait_for_lux(light_sensor, below=10)
+    await tft.print_console("\\rLuminosity: %s" % lvl)
+    await tft.print_console("\\rContinous luminosity measurement until\\ryou return to the previous screen.")
+    prev_lux = lvl
+    while True:
+        await uasyncio.sleep_ms(EVENT_TICK_MS)
+        lvl = light_sensor.lux_calc()
+        if lvl >= prev_lux * 1.05 or lvl <= prev_lux / 1.05:
+            clock.display_time("{:7.2f}".format(lvl), 0, 12, align="R")
+        prev_lux = lvl
+
+
+def format_rtc_datetime(rtc: machine.RTC = None):
     """
     Format the RTC datetime into a string
 
@@ -214,28 +453,51 @@ def format_rtc_datetime(rtc: machine.RTC):
     if rtc is None:
         rtc = machine.RTC()
 
-    current_time = rtc.datetime()
-    date = "%04d.%02d.%02d" % (current_time[0], current_time[1], current_time[2])
+    year, month, day, _, hour, minute, second, _ = rtc.datetime()
+    date = DATE_FORMAT % (year, month, day)
 
     if is_24h:
-        time = "%02d:%02d:%02d" % (current_time[4], current_time[5], current_time[6])
+        time = TIME_FORMAT_24H % (hour, minute, second)
     else:
-        if current_time[4] > 12:
-            time = "%02d:%02d:%02d PM" % (
-                current_time[4] - 12,
-                current_time[5],
-                current_time[6],
-            )
-        else:
-            time = "%02d:%02d:%02d AM" % (
-                current_time[4],
-                current_time[5],
-                current_time[6],
-            )
+        time = TIME_FORMAT_12H % (
+            hour - 12 if hour > 12 else hour,
+            minute,
+            second,
+            "PM" if hour >= 12 else "AM",
+        )
 
     return date, time
 
 
+def ensure_dir(path):
+    """
+    Create a directory unless it already exists
+
+    A stat only looks up the one directory entry, where listing the parent
+    reads every entry in it.
+
+    :param path: path of the directory
+    :return: None
+    """
+    try:
+        os.stat(path)
+    except OSError:
+        os.mkdir(path)
+
+
+def load_game_counter():
+    """
+    Read the number of the last saved game from the SD card
+
+    :return: the game counter, 0 if no game has been saved yet
+    """
+    try:
+        with open("/sd/game_counter.txt", "r") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return 0
+
+
 async def save_game_history_to_sd(the_game: Chess, result: str = "*", headers: dict = None):
     """
     Save the game history to the SD card
@@ -248,54 +510,88 @@ async def save_game_history_to_sd(the_game: Chess, result: str = "*", headers: d
 
     global sd_card_mounted
     global sd_card_detect
+    global game_counter
 
     # sd_card_detect is LOW when the card is inserted
     if sd_card_detect.value():
-        print("sd card not detected")
+        if DEBUG:
+            print("sd card not detected")
         return None
 
     if not sd_card_detect.value() and sd_card_mounted:
-        print("sd card is mounted")
+        if DEBUG:
+            print("sd card is mounted")
         try:
-            dir_list = os.listdir("/sd")
-            if "games" not in dir_list:
-                os.mkdir("/sd/games")
-            if "game_counter.txt" not in dir_list:
-                with open("/sd/game_counter.txt", "w") as f:
-                    f.write("0")
-            with open("/sd/game_counter.txt", "r") as f:
-                game_counter = f.read()
-                game_counter = int(game_counter.strip())
-                game_counter += 1
-
+            ensure_dir("/sd/games")
+            if game_counter is None:
+                game_counter = load_game_counter()
         except OSError as e:
             print("error: %s" % e)
             return "Error: %s" % e
 
+        game_counter += 1
         try:
             filename = "game_%d.pgn" % game_counter
-            with open("/sd/games/%s" % filename, "w") as f:
-                f.write(the_game.get_pgn(result=result, headers=headers))
+            pgn = memoryview(the_game.get_pgn(result=result, headers=headers).encode())
+            with open("/sd/games/%s" % filename, "wb") as f:
+                # Whole-sector writes avoid a read-modify-write of a partially filled sector
+                for i in range(0, len(pgn), SD_SECTOR_SIZE):
+                    f.write(pgn[i : i + SD_SECTOR_SIZE])
             with open("/sd/game_counter.txt", "w") as f:
-                print("new game counter: %d" % game_counter)
+                if DEBUG:
+                    print("new game counter: %d" % game_counter)
                 f.write(str(game_counter))
-                return filename
+            os.sync()
+            return filename
         except OSError as e:
             print("error writing to PGN file: %s" % e)
             return "Error: %s" % e
 
 
-async def event_listener():
-    global tft, queue, lock, rtc, game
-    global io_expander_interrupt_flag, chessboard, board, board_status, i2c
-    global white_clock, black_clock, i2c_mux, button_interrupt_flag, button_interrupt_id
+def show_fix_board_diff(chessboard: Chessboard, chessboard_led: ChessboardLED, pre_move_board_state: int):
+    """
+    Light up the squares that still differ from the position to restore
+
+    :param chessboard: Chessboard object, already read
+    :param chessboard_led: ChessboardLED object
+    :param pre_move_board_state: bitboard of the position before the last move
+    :return: None
+    """
+    current_bitboard = chessboard.convert_bitboard_to_int()
+    if DEBUG:
+        print("Translated bitboard:", current_bitboard)
+    in_position_state = current_bitboard & pre_move_board_state
+    # Same as ~current_bitboard & pre_move_board_state without building a negative bigint
+    out_position_state = pre_move_board_state ^ in_position_state
+    chessboard_led.paint_diff(in_position_state, out_position_state)
+
+
+async def event_listener(tft, rtc, chessboard, chessboard_led, white_clock, black_clock, light_sensor):
+    """
+    Main event loop handling Nextion touches, board changes and buttons
+
+    The peripherals are passed in once they are set up so the loop reads
+    them as locals; only the flags written by interrupt handlers stay global.
+    """
+    global io_expander_interrupt_flag, button_interrupt_flag, button_interrupt_id
+
+    # Cache frequently called chessboard methods as locals
+    read_board = chessboard.read_board
+    get_board_status = chessboard.get_board_status
+    coord_to_algebraic = chessboard.coord_to_algebraic
+    print_board = chessboard.print_board
+    update_board_move = chessboard.update_board_move
+    detect_move_positions = chessboard.detect_move_positions
+    detect_capture_move_positions = chessboard.detect_capture_move_positions
+    delta_board_positions = chessboard.delta_board_positions
 
     # Scope variables
 
     msg_count = 0
+    event_burst = 0
     loop_counter = 0
     is_display_sleeping = False
-    prev_board_status = board_status
+    prev_board_status = get_board_status()
     pre_move_board_state = STARTING_POSITION
     prev_ui_state = 0
     ui_state = 0
@@ -321,16 +617,17 @@ async def event_listener():
     uci_player_wait_flag = False
     uci_move = None
     cpu_2p_remote_has_moved = True
+    last_pv = None
 
-    chessboard.read_board()
-    board_status, board = chessboard.get_board()
+    read_board()
+    board_status = get_board_status()
     final_move_board_status = board_status
-    final_num_pieces = chessboard.count_pieces(board_status)
+    final_num_pieces = chessboard.piece_count
     final_move: tuple = (None, None)
     final_move_notation = None
-    curr_pieces = chessboard.count_pieces(board_status)
-    simulated_board_status = board_status
-    print("Initial board status: {}".format(board_status))
+    curr_pieces = final_num_pieces
+    if DEBUG:
+        print("Initial board status:", board_status)
     capture_flag = False
     piece_removed = False
     piece_identifier = None
@@ -351,12 +648,10 @@ async def event_listener():
     legal_moves = []
     previous_position = None
     origin_square = None
-    test_mode = False
-    test_running = False
+    test_task = None
     in_game_mode = False
     game_mode = MODE_VS_HUMAN
     game_over_flag = False
-    prev_lux = 0
     force_fix_board_flag = False
     fix_board_flag = False
     fix_board_setup_flag = False
@@ -374,419 +669,354 @@ async def event_listener():
     black_clock.clear()
     game = Chess()
 
+    # Bind the per-tick method lookups and event codes once, outside the loop
+    queue_size = queue.qsize
+    queue_get = queue.get_nowait
+    lock_locked = lock.locked
+    flush_buffer = tft.flush_buffer
+    parse_event = tft.parse_event
+    send_command = tft.send_command
+    send_batch = tft.send_batch
+    set_value = tft.set_value
+    print_console = tft.print_console
+    event_wait = event_flag.wait
+    sleep_ms = uasyncio.sleep_ms
+    wait_for_ms = uasyncio.wait_for_ms
+    timeout_error = uasyncio.TimeoutError
+    repl_button_value = repl_button.value
+    # Set up in main() before the listener starts and fixed from then on
+    rx_wakeup = uart_rx_wakeup
+    # Event codes are small ints, stored as immediates, so they can be compared with "is"
+    touch_event = nextion.TOUCH
+    touch_in_sleep_event = nextion.TOUCH_IN_SLEEP
+    touch_actions = TOUCH_ACTIONS
+
     while True:
-        if not lock.locked():
-            await lock.acquire()
-            await tft.flush_buffer()
-            lock.release()
+        # flush_buffer never yields, so no lock handshake is needed; only skip it
+        # while another coroutine holds the lock waiting on its command response
+        if not lock_locked():
+            flush_buffer()
+
+        # Sample the board once per tick when the IO expanders signal a change;
+        # the handlers below share this snapshot instead of re-reading the board
+        board_changed = io_expander_interrupt_flag
+        if board_changed:
+            io_expander_interrupt_flag = False
+            read_board()
+            board_status = get_board_status()
 
-        qs = queue.qsize()
+        qs = queue_size()
         event = None
         data = None
 
         if qs:
             msg_count += 1
-            message = queue.get_nowait()
-            print("%s message [%s]: %s" % (rtc.datetime(), msg_count, message))
-            event, data = await tft.parse_event(message)
+            message = queue_get()
+            if DEBUG:
+                print(rtc.datetime(), "message [%d]:" % msg_count, message)
+            event, data = await parse_event(message)
 
         # Parse Nextion events
-        if event == nextion.TOUCH:
+        if event is touch_event:
             (page, component, touch) = data
-            print("Touch event: Page %s, Component %s, Touch %s" % data)
-
-            # Go to main menu
-            if page == 18 and component == 5:
-                await tft.send_command("page main_menu")
-                chessboard_led.clear_board()
+            if DEBUG:
+                print("Touch event: Page", page, "Component", component, "Touch", touch)
+
+            # One dict lookup picks the handler; unmapped touches skip the chain
+            action = touch_actions.get((page, component))
+
+            if action:
+                # Go to main menu
+                if action == TOUCH_MAIN_MENU:
+                    await send_command("page main_menu")
+                    chessboard_led.clear_board()
+
+                # Start game vs CPU
+                elif action == TOUCH_START_VS_CPU:
+                    current_date, current_time = format_rtc_datetime(rtc)
+                    game_mode = MODE_VS_CPU
+                    game_progress_page_id = 6
+                    in_game_mode = True
+                    game_in_progress = False
+                    show_setup_message = False
+                    cpu_2p_remote_mode = True
+                    uci_player_wait_flag = False
+                    cpu_2p_remote_has_moved = True
+                    if DEBUG:
+                        print("CPU 2P remote mode:", cpu_2p_remote_mode)
+                    cpu_2p_remote_side = "w" if component == 15 else "b"
+                    if cpu_2p_remote_side == "w":
+                        white_clock_time = 600
+                        black_clock_time = 900
+                    else:
+                        white_clock_time = 900
+                        black_clock_time = 600
+                    pgn_headers = CPU_GAME_HEADERS.copy()
+                    pgn_headers["Date"] = current_date
+                    pgn_headers["Time"] = current_time
+                    cpu_level = await tft.get_value("start_cpu.level.val")
+                    if DEBUG:
+                        print("CPU level:", cpu_level)
+                    await send_command("page connect_cpu")
+                    chessboard_led.clear_board()
+                    if uci_player is None:
+                        uci_player = UCI(STOCKFISH_SERVER, STOCKFISH_PORT)
+                        await uci_player.start()
+                    else:
+                        await uci_player.stop()
+                        await uci_player.start()
+                    await send_batch(["page board_setup", tft.clear_console_command(page="gm_progress_c")])
+
+                # Start game vs human
+                elif action == TOUCH_START_VS_HUMAN:
+                    current_date, current_time = format_rtc_datetime(rtc)
+                    game_mode = MODE_VS_HUMAN
+                    game_progress_page_id = 7
+                    in_game_mode = True
+                    game_in_progress = False
+                    show_setup_message = False
+                    white_clock_time = 180
+                    black_clock_time = 180
+                    pgn_headers = HUMAN_GAME_HEADERS.copy()
+                    pgn_headers["Date"] = current_date
+                    pgn_headers["Time"] = current_time
+                    await send_batch(["page board_setup", tft.clear_console_command(page="game_progress")])
+
+                # Start game vs human remote
+                elif action == TOUCH_START_VS_HUMAN_REMOTE:
+                    current_date, current_time = format_rtc_datetime(rtc)
+                    game_mode = MODE_VS_HUMAN_REMOTE
+                    game_progress_page_id = 5
+                    in_game_mode = True
+                    pgn_headers = HUMAN_GAME_HEADERS.copy()
+                    pgn_headers["Date"] = current_date
+                    pgn_headers["Time"] = current_time
+                    await send_command("page start_remote")
+
+                # Run RGB LED strip test
+                elif action == TOUCH_TEST_RGB:
+                    if DEBUG:
+                        print("Running RGB LED strip test")
+                    await chessboard_led.rgb_test(tft.print_console)
+
+                # Fix board position
+                elif action == TOUCH_FIX_BOARD:
+                    force_fix_board_flag = True
+
+                # Fix board position completed
+                elif action == TOUCH_FIX_BOARD_DONE:
+                    if DEBUG:
+                        print("Fix board position completed")
+                    fix_board_flag = False
+                    force_fix_board_flag = False
+                    if DEBUG:
+                        print("Before fen parse")
+                        print_board()
+                    chessboard.parse_fen(game.get_fen())
+                    if DEBUG:
+                        print("After fen parse")
+                        print_board()
+                    read_board()
+                    board_status = get_board_status()
+                    num_pieces = chessboard.piece_count
+                    if DEBUG:
+                        print("Board status:", board_status)
+                    prev_board_status = board_status
+                    # Reset move, castling and promotion state
+                    move_notation = original_position = None
+                    move_complete_flag = position_changed_flag = False
+                    castling_complete_flag = finish_castling_flag = in_castling_position = False
+                    potential_castle = is_castling = False
+                    potential_promotion = is_promoting = promotion_complete_flag = finish_promotion_select_flag = False
+                    # Reset piece tracking
+                    piece_removed = capture_flag = False
+                    board_state_piece_lifted = board_state_capturing_piece = board_state_captured_piece = 0
+                    curr_pieces = num_pieces
+                    if DEBUG:
+                        print_board()
+                    chessboard_led.show_occupied_squares(chessboard)
+                    if game.turn == "w":
+                        white_clock.start_clock()
+                        black_clock.stop_clock()
+                    else:
+                        white_clock.stop_clock()
+                        black_clock.start_clock()
+
+                # Save game history to SD Card
+                elif action == TOUCH_SAVE_GAME:
+                    if sd_card_mounted:
+                        if DEBUG:
+                            print("Saving game history to SD Card")
+                        await send_command("page save_game")
+                        fn = await save_game_history_to_sd(game, result=game_result, headers=pgn_headers)
+                        await set_value("save_game.file_name.txt", fn)
+                        await uasyncio.sleep(4)
+                        await send_command("page game_ended")
 
-            # Start game vs CPU
-            if (page == 16 and component == 2) or (page == 16 and component == 15):
-                current_date, current_time = format_rtc_datetime(rtc)
-                game_mode = MODE_VS_CPU
-                game_progress_page_id = 6
-                in_game_mode = True
-                game_in_progress = False
-                show_setup_message = False
-                cpu_2p_remote_mode = True
-                uci_player_wait_flag = False
-                cpu_2p_remote_has_moved = True
-                print("CPU 2P remote mode: %s" % cpu_2p_remote_mode)
-                cpu_2p_remote_side = "w" if component == 15 else "b"
-                if cpu_2p_remote_side == "w":
-                    white_clock_time = 600
-                    black_clock_time = 900
-                    pgn_headers = {
-                        "White": "Human",
-                        "Black": "CPU",
-                        "Event": "Game vs CPU",
-                        "Site": "Imagine RIT",
-                        "Date": "%s" % current_date,
-                        "Time": "%s" % current_time,
-                    }
-                else:
-                    white_clock_time = 900
-                    black_clock_time = 600
-                    pgn_headers = {
-                        "White": "Human",
-                        "Black": "CPU",
-                        "Event": "Game vs CPU",
-                        "Site": "Imagine RIT",
-                        "Date": "%s" % current_date,
-                        "Time": "%s" % current_time,
-                    }
-                cpu_level = await tft.get_value("start_cpu.level.val")
-                print("CPU level: %s" % cpu_level)
-                await tft.send_command("page connect_cpu")
-                chessboard_led.clear_board()
-                if uci_player is None:
-                    uci_player = UCI(STOCKFISH_SERVER, STOCKFISH_PORT)
-                    await uci_player.start()
-                else:
-                    await uci_player.stop()
-                    await uci_player.start()
-                await tft.send_command("page board_setup")
-                await tft.clear_console(page="gm_progress_c")
-
-            # Start game vs human
-            if page == 4 and component == 3:
-                current_date, current_time = format_rtc_datetime(rtc)
-                game_mode = MODE_VS_HUMAN
-                game_progress_page_id = 7
-                in_game_mode = True
-                game_in_progress = False
-                show_setup_message = False
-                white_clock_time = 180
-                black_clock_time = 180
-                pgn_headers = {
-                    "White": "Human",
-                    "Black": "Human",
-                    "Event": "2 player game",
-                    "Site": "Imagine RIT",
-                    "Date": "%s" % current_date,
-                    "Time": "%s" % current_time,
-                }
-                await tft.send_command("page board_setup")
-                await tft.clear_console(page="game_progress")
-
-            # Start game vs human remote
-            if page == 4 and component == 5:
-                current_date, current_time = format_rtc_datetime(rtc)
-                game_mode = MODE_VS_HUMAN_REMOTE
-                game_progress_page_id = 5
-                in_game_mode = True
-                pgn_headers = {
-                    "White": "Human",
-                    "Black": "Human",
-                    "Event": "2 player game",
-                    "Site": "Imagine RIT",
-                    "Date": "%s" % current_date,
-                    "Time": "%s" % current_time,
-                }
-                await tft.send_command("page start_remote")
-
-            # Run RGB LED strip test
-            if page == 11 and component == 4:
-                test_mode = 1
-                print("Running RGB LED strip test")
-                await chessboard_led.rgb_test(tft.print_console)
-
-            # Fix board position
-            if page in [5, 6, 7] and component == 6:
-                force_fix_board_flag = True
-
-            # Fix board position completed
-            if page == 14 and component == 5:
-                print("Fix board position completed")
-                fix_board_flag = False
-                force_fix_board_flag = False
-                print("Before fen parse")
-                chessboard.print_board()
-                chessboard.parse_fen(game.get_fen())
-                print("After fen parse")
-                chessboard.print_board()
-                chessboard.read_board()
-                board_status, board = chessboard.get_board()
-                num_pieces = chessboard.count_pieces(board_status)
-                print("Board status: %s" % board_status)
-                prev_board_status = board_status
-                castling_complete_flag = False
-                finish_castling_flag = False
-                in_castling_position = False
-                potential_castle = False
-                is_castling = False
-                move_notation = None
-                original_position = None
-                move_complete_flag = False
-                piece_removed = False
-                capture_flag = False
-                board_state_piece_lifted = 0
-                board_state_capturing_piece = 0
-                board_state_captured_piece = 0
-                curr_pieces = num_pieces
-                chessboard.print_board()
-                chessboard_led.clear_board()
-                chessboard_led.show_occupied_squares(chessboard)
-                position_changed_flag = False
-                potential_castle = False
-                is_castling = False
-                potential_promotion = False
-                is_promoting = False
-                promotion_complete_flag = False
-                finish_promotion_select_flag = False
-                if game.turn == "w":
-                    white_clock.start_clock()
+                    else:
+                        if DEBUG:
+                            print("SD Card not mounted")
+                        await send_command("page save_game")
+                        await print_console("SD Card not mounted")
+                        await uasyncio.sleep(4)
+
+                # Start New Game - Same Game Mode
+                elif action == TOUCH_NEW_GAME:
+                    if DEBUG:
+                        print("Start new game")
+                    game = Chess()
+                    in_game_mode = True
+                    show_setup_message = False
+                    game_in_progress = False
+                    game_over_flag = False
+                    await send_batch(["page board_setup", tft.clear_console_command(page=console_tag)])
+
+                # Select promotion piece
+                elif action == TOUCH_SELECT_PROMOTION:
+                    if DEBUG:
+                        print("Select promotion piece")
+                    if component == 2:
+                        promotion_piece = "Q"
+                    elif component == 7:
+                        promotion_piece = "B"
+                    elif component == 8:
+                        promotion_piece = "N"
+                    elif component == 9:
+                        promotion_piece = "R"
+                    if DEBUG:
+                        print("Promotion piece:", promotion_piece)
+                    await send_command("page %s" % game_progress_page_id)
+                    promotion_complete_flag = True
+
+                # Run OLED test
+                elif action == TOUCH_TEST_OLED:
+                    if DEBUG:
+                        print("Running OLED test")
+                    test_task = uasyncio.create_task(oled_test(tft, white_clock, black_clock))
+
+                # Run ambient light sensor test
+                elif action == TOUCH_TEST_ALS:
+                    white_clock.clear()
+                    black_clock.clear()
+                    test_task = uasyncio.create_task(als_test(tft, light_sensor, white_clock))
+
+                # Stop test mode
+                elif action == TOUCH_STOP_TEST:
+                    if test_task is not None:
+                        test_task.cancel()
+                        test_task = None
+                    for clock in (white_clock, black_clock):
+                        if clock.is_clock_running():
+                            clock.stop_clock()
+                        clock.clear()
+
+                # End game button pressed and resigned
+                elif action == TOUCH_RESIGN:
+                    if DEBUG:
+                        print("Player Resigned")
+                    if game.turn == "w":
+                        winner = "Black"
+                        chessboard_led.show_checkmate("w")
+                        game.result = "0-1"
+                    else:
+                        winner = "White"
+                        chessboard_led.show_checkmate("b")
+                        game.result = "1-0"
+                    await send_batch(["page game_ended", 't2.txt="Resigned"', 't3.txt="%s Wins"' % winner])
+                    game.game_over_flag = True
+                    await console_move_history(
+                        game.get_move_history(),
+                        game.fullmove,
+                        max_lines=16,
+                        game_over=game.game_over_flag,
+                        result=game.result,
+                        page="game_ended",
+                    )
                     black_clock.stop_clock()
-                else:
                     white_clock.stop_clock()
-                    black_clock.start_clock()
-
-            # Save game history to SD Card
-            if page == 18 and component == 12:
-                if sd_card_mounted:
-                    print("Saving game history to SD Card")
-                    await tft.send_command("page save_game")
-                    fn = await save_game_history_to_sd(game, result=game_result, headers=pgn_headers)
-                    await tft.set_value("save_game.file_name.txt", fn)
-                    await uasyncio.sleep(4)
-                    await tft.send_command("page game_ended")
-
-                else:
-                    print("SD Card not mounted")
-                    await tft.send_command("page save_game")
-                    await tft.print_console("SD Card not mounted")
-                    await uasyncio.sleep(4)
-
-            # Start New Game - Same Game Mode
-            if (page == 18 and component == 8) or (page == 7 and component == 10):
-                print("Start new game")
-                game = Chess()
-                in_game_mode = True
-                show_setup_message = False
-                game_in_progress = False
-                game_over_flag = False
-                await tft.send_command("page board_setup")
-                await tft.clear_console(page=console_tag)
-
-            # Select promotion piece
-            if page == 19 and component in [2, 7, 8, 9]:
-                print("Select promotion piece")
-                if component == 2:
-                    promotion_piece = "Q"
-                elif component == 7:
-                    promotion_piece = "B"
-                elif component == 8:
-                    promotion_piece = "N"
-                elif component == 9:
-                    promotion_piece = "R"
-                print("Promotion piece: %s" % promotion_piece)
-                await tft.send_command("page %s" % game_progress_page_id)
-                promotion_complete_flag = True
-
-            # Run OLED test
-            if page == 11 and component == 5:
-                test_mode = 2
-                test_running = True
-                print("Running OLED test")
-                white_clock.clear()
-                black_clock.clear()
-                await tft.clear_console()
-                await tft.print_console("Testing white OLED display...")
-                white_clock.display_text("0123456789ABCDEF", 0, 0)
-                white_clock.display_text("GHIJKLMNOPQRSTUVW", 0, 10, clear=False)
-                white_clock.display_text("XYZ!@#$%^&*(){}',.", 0, 20, clear=False)
-                await uasyncio.sleep_ms(2000)
-                white_clock.clear()
-                await tft.print_console("Done\\rTesting black OLED display...")
-                black_clock.display_text("0123456789ABCDEF", 0, 0)
-                black_clock.display_text("GHIJKLMNOPQRSTUVW", 0, 10, clear=False)
-                black_clock.display_text("XYZ!@#$%^&*(){}',.", 0, 20, clear=False)
-                await uasyncio.sleep_ms(2000)
-                black_clock.clear()
-                await tft.print_console("Done\\rTesting white clock...")
-                white_clock.set_clock(10)
-                white_clock.start_clock()
-                if white_clock.is_clock_running():
-                    print("White clock started")
-                black_clock.set_clock(10)
-
-            # Run ambient light sensor test
-            if page == 11 and component == 6:
-                test_mode = 3
-                test_running = True
-                white_clock.clear()
-                black_clock.clear()
-                lvl = light_sensor.lux_calc()
-                await tft.clear_console()
-                await tft.print_console("Shine bright light on the sensor")
-                while lvl < 20000:
-                    lvl = light_sensor.lux_calc()
-                    await uasyncio.sleep_ms(100)
-                await tft.print_console("\\rLuminosity: %s" % lvl)
-                await tft.print_console("\\rCover the sensor with your finger")
-                while lvl > 10:
-                    lvl = light_sensor.lux_calc()
-                    await uasyncio.sleep_ms(100)
-                await tft.print_console("\\rLuminosity: %s" % lvl)
-                await tft.print_console(
-                    "\\rContinous luminosity measurement until\\ryou return to the previous screen."
-                )
-                prev_lux = lvl
-
-            # Stop test mode
-            if page == 12 and component == 3:
-                test_mode = False
-                white_clock.clear()
-                black_clock.clear()
-
-            # End game button pressed and resigned
-            if page == 23 and component == 9:
-                print("Player Resigned")
-                await tft.send_command("page game_ended")
-
-                await tft.set_value("t2.txt", "Resigned")
-                if game.turn == "w":
-                    await tft.set_value("t3.txt", "Black Wins")
-                    chessboard_led.show_checkmate("w")
-                    game.result = "0-1"
-                else:
-                    await tft.set_value("t3.txt", "White Wins")
-                    chessboard_led.show_checkmate("b")
-                    game.result = "1-0"
-                game.game_over_flag = True
-                await console_move_history(
-                    game.get_move_history(),
-                    game.fullmove,
-                    max_lines=16,
-                    game_over=game.game_over_flag,
-                    result=game.result,
-                    page="game_ended",
-                )
-                black_clock.stop_clock()
-                white_clock.stop_clock()
-                black_clock.clear()
-                white_clock.clear()
-                game_in_progress = False
-                game_over_flag = True
-                game_result = game.result
-
-            if page == 23 and component == 10:
-                print("Game abandoned")
-                if game_mode == MODE_VS_CPU:
-                    await uci_player.stop()
-                await tft.send_command("page main_menu")
-                chessboard_led.clear_board()
-                black_clock.stop_clock()
-                white_clock.stop_clock()
-                black_clock.clear()
-                white_clock.clear()
-                game_in_progress = False
-                game_over_flag = False
+                    black_clock.clear()
+                    white_clock.clear()
+                    game_in_progress = False
+                    game_over_flag = True
+                    game_result = game.result
+
+                # Game abandoned
+                elif action == TOUCH_ABANDON:
+                    if DEBUG:
+                        print("Game abandoned")
+                    if game_mode == MODE_VS_CPU:
+                        await uci_player.stop()
+                    await send_command("page main_menu")
+                    chessboard_led.clear_board()
+                    black_clock.stop_clock()
+                    white_clock.stop_clock()
+                    black_clock.clear()
+                    white_clock.clear()
+                    game_in_progress = False
+                    game_over_flag = False
 
-        if event == nextion.TOUCH_IN_SLEEP:
+        elif event is touch_in_sleep_event:
             (page, component, touch) = data
-            print("Touch in sleep event: Page %s, Component %s, Touch %s" % data)
+            if DEBUG:
+                print("Touch in sleep event: Page", page, "Component", component, "Touch", touch)
+
+        # Fix-board mode, a request to enter it, and normal play exclude each other,
+        # so one chain picks the branch for this pass
+        if fix_board_flag:
+            # Handle fix board event
+            if in_game_mode and board_changed:
+                show_fix_board_diff(chessboard, chessboard_led, pre_move_board_state)
 
         # Handle Fix Last Position Event
-        if force_fix_board_flag and not fix_board_flag:
-            if event != nextion.TOUCH:
-                await tft.set_value("board_preview.prev_page.val", game_progress_page_id)
-                await tft.send_command("page board_preview")
-            print("Show Segoe chess board position on Nextion display")
+        elif force_fix_board_flag:
+            if event is not touch_event:
+                await set_value("board_preview.prev_page.val", game_progress_page_id)
+                await send_command("page board_preview")
+            if DEBUG:
+                print("Show Segoe chess board position on Nextion display")
             fix_board_flag = True
             force_fix_board_flag = False
             black_clock.stop_clock()
             white_clock.stop_clock()
             segoe_board = game.get_segoe_chess_board()
-            print("Segoe board: %s" % segoe_board)
-            await tft.set_value("board_preview.board.txt", segoe_board)
-            chessboard.read_board()
-            current_bitboard = chessboard.convert_bitboard_to_int()
-            print("Translated bitboard: {}".format(current_bitboard))
-            in_position_state = current_bitboard & pre_move_board_state
-            out_position_state = ~current_bitboard & pre_move_board_state
-            chessboard_led.zero_bitboard_squares()
-            chessboard_led.prepare_bitboard_square(in_position_state, (0, 48, 0))
-            chessboard_led.prepare_bitboard_square(out_position_state, (58, 0, 0))
-            chessboard_led.display_bitboard_squares()
-
-        # Perform test mode
-        if test_mode == 2:  # OLED Display test
-            if (
-                white_clock.is_clock_expired()
-                and not black_clock.is_clock_running()
-                and not black_clock.is_clock_expired()
-            ):
-                white_clock.update_clock()
-                await tft.print_console("Done\\rTesting black clock...")
-                white_clock.stop_clock()
-                black_clock.start_clock()
-            elif black_clock.is_clock_expired() and test_running:
-                black_clock.update_clock()
-                black_clock.stop_clock()
-                white_clock.clear()
-                black_clock.clear()
-                await tft.print_console("Done\\rTesting complete")
-                test_running = False
-            elif black_clock.is_clock_running():
-                black_clock.update_clock()
-            elif white_clock.is_clock_running():
-                white_clock.update_clock()
-
-        if test_mode == 3:  # ALS Sensor Test
-            lvl = light_sensor.lux_calc()
-            min_lvl = prev_lux / 1.05
-            max_lvl = prev_lux * 1.05
-            if lvl >= max_lvl or lvl <= min_lvl:
-                print("max: %s, min: %s, lvl: %s" % (max_lvl, min_lvl, lvl))
-                clock_text = "{:7.2f}".format(lvl)
-                white_clock.display_time(clock_text, 0, 12, align="R")
-            prev_lux = lvl
-        elif test_mode == 4:  # Hall Effect Sensor Test
-            pass
-
-        # Handle fix board event
-        if in_game_mode and fix_board_flag and io_expander_interrupt_flag:
-            io_expander_interrupt_flag = False
-            chessboard.read_board()
-            current_bitboard = chessboard.convert_bitboard_to_int()
-            print("Translated bitboard: {}".format(current_bitboard))
-            in_position_state = current_bitboard & pre_move_board_state
-            out_position_state = ~current_bitboard & pre_move_board_state
-            chessboard_led.zero_bitboard_squares()
-            chessboard_led.prepare_bitboard_square(in_position_state, (0, 48, 0))
-            chessboard_led.prepare_bitboard_square(out_position_state, (58, 0, 0))
-            chessboard_led.display_bitboard_squares()
+            if DEBUG:
+                print("Segoe board:", segoe_board)
+            await set_value("board_preview.board.txt", segoe_board)
+            if not board_changed:
+                read_board()
+            show_fix_board_diff(chessboard, chessboard_led, pre_move_board_state)
 
         # Handle board setup
-        if in_game_mode and not fix_board_flag:
+        elif in_game_mode:
             if not game_in_progress and not show_setup_message:
-                print("Set up the playing pieces on the board")
+                if DEBUG:
+                    print("Set up the playing pieces on the board")
                 show_setup_message = True
                 white_clock.display_text("Board Setup", 0, 5)
                 black_clock.display_text("Board Setup", 0, 5)
-                prev_board_status, board = chessboard.get_board()
+                prev_board_status = get_board_status()
                 chessboard_led.show_setup_squares(chessboard)
-                io_expander_interrupt_flag = True
-                while True:
+                io_expander_interrupt_flag = False
+                read_board()
+                board_status = get_board_status()
+                if board_status != prev_board_status:
+                    chessboard_led.show_setup_squares(chessboard)
+                # Sleep until the IO expander interrupt fires instead of polling;
+                # event_flag is shared with the buttons, so check which one woke us
+                # and only repaint after the board has actually been re-read
+                while board_status != STARTING_POSITION:
+                    await event_wait()
                     if io_expander_interrupt_flag:
                         io_expander_interrupt_flag = False
-                        chessboard.read_board()
-                        board_status, board = chessboard.get_board()
-                        if board_status != prev_board_status:
-                            chessboard_led.show_setup_squares(chessboard)
-                        if board_status == STARTING_POSITION:
-                            chessboard_led.clear_board()
-                            break
-                    await uasyncio.sleep_ms(100)
+                        read_board()
+                        board_status = get_board_status()
+                        chessboard_led.show_setup_squares(chessboard)
+                chessboard_led.clear_board()
                 white_clock.clear()
-                black_clock.display_text("Ready to start.", 0, 0)
-                black_clock.display_text("Press the button", 0, 10, clear=False)
-                black_clock.display_text("to start game.", 0, 20, clear=False)
+                black_clock.display_lines(["Ready to start.", "Press the button", "to start game."])
                 prev_board_status = board_status
-                simulated_board_status = board_status
                 move_complete_flag = False
-                await tft.send_command("page press_start")
+                await send_command("page press_start")
 
             # Game in progress Logic starts here
             # Handle CPU move
@@ -796,7 +1026,8 @@ async def event_listener():
                     uci_player.go(fen, 15, 3000)
                     uci_player_wait_flag = True
                     cpu_2p_remote_has_moved = False
-                    await tft.print_console(
+                    last_pv = None
+                    await print_console(
                         "Thinking...",
                         max_lines=9,
                         page="gm_progress_c",
@@ -806,30 +1037,35 @@ async def event_listener():
                 if game.turn == cpu_2p_remote_side and uci_player_wait_flag and not cpu_2p_remote_has_moved:
                     response = await uci_player.engine_response(["info", "bestmove"])
                     if response is None:
-                        print("No response received from engine, retrying...")
+                        if DEBUG:
+                            print("No response received from engine, retrying...")
                         uci_player_wait_flag = False
                     elif response.startswith("bestmove"):
                         cpu_2p_remote_has_moved = True
                         uci_move = response.split(" ")[1]
                         cpu_move = "CPU move: {}".format(uci_move)
-                        print(cpu_move)
-                        await tft.print_console(
+                        if DEBUG:
+                            print(cpu_move)
+                        await print_console(
                             cpu_move + "\\r",
                             max_lines=9,
                             page="gm_progress_c",
                             txt_name="analysis",
                         )
                         chessboard_led.show_interim_move(uci_move, cpu_2p_remote_side)
-                    else:
+                    # Most info lines carry no score; skip them before tokenizing
+                    elif " score " in response:
                         try:
                             info = parse_info(response)
-                            if "score" in info:
+                            # Only redraw the analysis when the principal variation changes
+                            if "score" in info and info["pv"] != last_pv:
+                                last_pv = info["pv"]
                                 analysis = "Depth: %s Score: %s\\r%s\\r" % (
                                     info["depth"],
                                     info["score"],
                                     info["pv"],
                                 )
-                                await tft.print_console(
+                                await print_console(
                                     analysis,
                                     max_lines=9,
                                     page="gm_progress_c",
@@ -837,75 +1073,73 @@ async def event_listener():
                                 )
                         except ValueError:
                             pass
-                if game.turn == cpu_2p_remote_side and uci_player_wait_flag and cpu_2p_remote_has_moved:
-                    pass
 
             # Handle button interrupts (LOW = pressed)
 
             if button_interrupt_flag:
                 button_interrupt_flag = False
-
-                if (not button_white.value() and not button_black.value() and game_in_progress) or (
-                    not button_black.value() and not game_in_progress
-                ):
-                    if not button_white.value() and not button_black.value():
-                        print("Both buttons pressed")
-                        print("Resetting board positions")
+                # Sample both buttons once so every check below sees the same press
+                white_pressed = not button_white.value()
+                black_pressed = not button_black.value()
+
+                if (white_pressed and black_pressed and game_in_progress) or (black_pressed and not game_in_progress):
+                    if white_pressed and black_pressed:
+                        if DEBUG:
+                            print("Both buttons pressed")
+                            print("Resetting board positions")
                         game_in_progress = False
                         show_setup_message = False
                         white_clock.display_text("Game reset.", 0, 0)
                         black_clock.display_text("Game reset.", 0, 0)
-                    piece_removed = False
-                    capture_flag = False
-                    board_state_piece_lifted = 0
-                    board_state_capturing_piece = 0
-                    board_state_captured_piece = 0
+                    # Reset piece tracking
+                    piece_removed = capture_flag = False
+                    board_state_piece_lifted = board_state_capturing_piece = board_state_captured_piece = 0
                     position_changed_flag = False
                     chessboard.reset_board()
-                    chessboard.read_board()
-                    board_status, board = chessboard.get_board()
+                    read_board()
+                    board_status = get_board_status()
                     prev_board_status = board_status
-                    simulated_board_status = board_status
-                    curr_pieces = chessboard.count_pieces(board_status)
-                    chessboard.print_board()
+                    curr_pieces = chessboard.piece_count
+                    if DEBUG:
+                        print_board()
 
                     # Black Clock Button Pressed to Start Game
-                    if not button_black.value() and button_white.value():
+                    if black_pressed and not white_pressed:
                         if game_mode == MODE_VS_HUMAN:
-                            await tft.send_command("page game_progress")
-                            await tft.clear_console(page="game_progress")
-                            await tft.print_console("1. ...", page="game_progress")
                             console_tag = "game_progress"
                         elif game_mode == MODE_VS_CPU:
-                            await tft.send_command("page gm_progress_c")
-                            await tft.clear_console(page="gm_progress_c")
-                            await tft.print_console("1. ...", page="gm_progress_c")
-                            await tft.clear_analysis(page="gm_progress_c")
                             console_tag = "gm_progress_c"
                         elif game_mode == MODE_VS_HUMAN_REMOTE:
-                            await tft.send_command("page gm_progress_r")
-                            await tft.clear_console(page="gm_progress_r")
-                            await tft.print_console("1. ...", page="gm_progress_r")
-                            await tft.clear_analysis(page="gm_progress_r")
                             console_tag = "gm_progress_r"
+                        # Page change, console and analysis reset go out as one UART write
+                        commands = ["page %s" % console_tag, '%s.console.txt="1. ..."' % console_tag]
+                        if game_mode != MODE_VS_HUMAN:
+                            commands.append('%s.analysis.txt=""' % console_tag)
+                        await send_batch(commands)
                         game_in_progress = True
                         game.reset_board()
+                        # Collect the setup garbage now rather than mid-game
+                        gc.collect()
                         update_led_board = True
                         game_over_flag = False
-                        print("turn: {}".format(game.turn))
+                        if DEBUG:
+                            print("turn:", game.turn)
                         white_clock.set_clock(white_clock_time)
                         white_clock.start_clock()
                         black_clock.set_clock(black_clock_time)
 
                 # Clock button was pressed to accept a chess move
                 elif game_in_progress:
-                    if not button_white.value() and game.turn == "w":
-                        print("White button pressed")
+                    if white_pressed and game.turn == "w":
+                        if DEBUG:
+                            print("White button pressed")
                         white_clock.stop_clock()
                         if move_complete_flag:
-                            print("Move complete, updating board")
+                            if DEBUG:
+                                print("Move complete, updating board")
                             if potential_castle and is_castling and castling_complete_flag:
-                                print("Castling complete, updating board")
+                                if DEBUG:
+                                    print("Castling complete, updating board")
                                 chessboard.update_castling_move(game.turn, castling_side)
                                 move_notation = "O-O" if castling_side == "K" else "O-O-O"
                                 potential_castle = False
@@ -916,35 +1150,29 @@ async def event_listener():
                             elif potential_en_passant and is_en_passant_move:
                                 chessboard.update_board_en_passant(game.turn, final_move, game.enpassant)
                             elif potential_promotion and is_promoting and promotion_complete_flag:
-                                print("Promotion complete, updating board")
+                                if DEBUG:
+                                    print("Promotion complete, updating board")
                                 chessboard.update_board_promotion(final_move, promotion_piece)
                                 if capture_flag:
                                     move_notation = "%sx%s" % final_move
                                 else:
                                     move_notation = "%s-%s" % final_move
                                 move_notation += "=%s" % promotion_piece
-                                print("move notation: %s" % move_notation)
-                                potential_promotion = False
-                                is_promoting = False
-                                promotion_complete_flag = False
-                                finish_promotion_select_flag = False
+                                if DEBUG:
+                                    print("move notation:", move_notation)
+                                potential_promotion = is_promoting = False
+                                promotion_complete_flag = finish_promotion_select_flag = False
                             else:
-                                chessboard.update_board_move(final_move)
+                                update_board_move(final_move)
 
                             # Reset flags
                             prev_board_status = board_status
-                            piece_removed = False
-                            capture_flag = False
-                            board_state_piece_lifted = 0
-                            board_state_capturing_piece = 0
-                            board_state_captured_piece = 0
+                            piece_removed = capture_flag = False
+                            board_state_piece_lifted = board_state_capturing_piece = board_state_captured_piece = 0
                             curr_pieces = final_num_pieces
-                            position_changed_flag = False
                             final_move = (None, None)
-                            move_complete_flag = False
-                            potential_en_passant = False
-                            is_en_passant_move = False
-                            chessboard_led.clear_board()
+                            position_changed_flag = move_complete_flag = False
+                            potential_en_passant = is_en_passant_move = False
                             game.make_move(move_notation, side="w")
                             update_led_board = True
                             pre_move_board_state = chessboard.convert_bitboard_to_int()
@@ -952,27 +1180,31 @@ async def event_listener():
                                 if game.turn == cpu_2p_remote_side:
                                     uci_player_wait_flag = False
                                     cpu_2p_remote_has_moved = False
-                            await console_move_history(
-                                game.get_move_history(),
-                                game.fullmove,
-                                max_lines=16,
-                                game_over=game.game_over_flag,
-                                result=game.result,
-                                page=console_tag,
-                            )
+                            # Redraw the history from its own task so the next clock starts
+                            # without waiting on the Nextion; a finished game is drawn on the
+                            # game_ended page below instead
+                            if not game.game_over_flag:
+                                uasyncio.create_task(
+                                    console_move_history(
+                                        game.get_move_history(), game.fullmove, max_lines=16, page=console_tag
+                                    )
+                                )
                             if game_mode != MODE_VS_CPU or (game_mode == MODE_VS_CPU and cpu_2p_remote_side == "w"):
                                 black_clock.add_clock_countdown(5)
                             black_clock.start_clock()
                             move_complete_flag = False
                         else:
-                            print("Incomplete move")
+                            if DEBUG:
+                                print("Incomplete move")
                             white_clock.start_clock()
                             chessboard_led.clear_board()
-                    elif not button_black.value() and game.turn == "b":
-                        print("Black button pressed")
+                    elif black_pressed and game.turn == "b":
+                        if DEBUG:
+                            print("Black button pressed")
                         black_clock.stop_clock()
                         if move_complete_flag:
-                            print("Move complete, updating board")
+                            if DEBUG:
+                                print("Move complete, updating board")
                             if potential_castle and is_castling and castling_complete_flag:
                                 chessboard.update_castling_move(game.turn, castling_side)
                                 move_notation = "O-O" if castling_side == "K" else "O-O-O"
@@ -984,36 +1216,29 @@ async def event_listener():
                             elif potential_en_passant and is_en_passant_move:
                                 chessboard.update_board_en_passant(game.turn, final_move, game.enpassant)
                             elif potential_promotion and is_promoting and promotion_complete_flag:
-                                print("Promotion complete, updating board")
+                                if DEBUG:
+                                    print("Promotion complete, updating board")
                                 chessboard.update_board_promotion(final_move, promotion_piece)
                                 if capture_flag:
                                     move_notation = "%sx%s" % final_move
                                 else:
                                     move_notation = "%s-%s" % final_move
                                 move_notation += "=%s" % promotion_piece
-                                print("move notation: %s" % move_notation)
-                                potential_promotion = False
-                                is_promoting = False
-                                promotion_complete_flag = False
-                                finish_promotion_select_flag = False
+                                if DEBUG:
+                                    print("move notation:", move_notation)
+                                potential_promotion = is_promoting = False
+                                promotion_complete_flag = finish_promotion_select_flag = False
                             else:
-                                chessboard.update_board_move(final_move)
+                                update_board_move(final_move)
 
                             # Reset flags
                             prev_board_status = board_status
-                            piece_removed = False
-                            capture_flag = False
-                            board_state_piece_lifted = 0
-                            board_state_capturing_piece = 0
-                            board_state_captured_piece = 0
+                            piece_removed = capture_flag = False
+                            board_state_piece_lifted = board_state_capturing_piece = board_state_captured_piece = 0
                             curr_pieces = final_num_pieces
-                            chessboard_led.show_interim_move(move_notation, game.turn)
-                            position_changed_flag = False
                             final_move = (None, None)
-                            move_complete_flag = False
-                            potential_en_passant = False
-                            is_en_passant_move = False
-                            chessboard_led.clear_board()
+                            position_changed_flag = move_complete_flag = False
+                            potential_en_passant = is_en_passant_move = False
                             game.make_move(move_notation, side="b")
                             update_led_board = True
                             black_clock.stop_clock()
@@ -1022,476 +1247,525 @@ async def event_listener():
                                 if game.turn == cpu_2p_remote_side:
                                     uci_player_wait_flag = False
                                     cpu_2p_remote_has_moved = False
-                            await console_move_history(
-                                game.get_move_history(),
-                                game.fullmove,
-                                max_lines=16,
-                                game_over=game.game_over_flag,
-                                result=game.result,
-                                page=console_tag,
-                            )
+                            # Redraw the history from its own task so the next clock starts
+                            # without waiting on the Nextion; a finished game is drawn on the
+                            # game_ended page below instead
+                            if not game.game_over_flag:
+                                uasyncio.create_task(
+                                    console_move_history(
+                                        game.get_move_history(), game.fullmove, max_lines=16, page=console_tag
+                                    )
+                                )
                             if game_mode != MODE_VS_CPU or (game_mode == MODE_VS_CPU and cpu_2p_remote_side == "b"):
                                 white_clock.add_clock_countdown(5)
                             white_clock.start_clock()
                         else:
-                            print("Incomplete move")
+                            if DEBUG:
+                                print("Incomplete move")
                             black_clock.start_clock()
                             chessboard_led.clear_board()
-                    chessboard.print_board()
-                    print("turn: {}".format(game.turn))
-                    print(game)
-
-            # Simulate io_expander interrupt (due to errorenous pin assignment in schematic)
-            # is triggered when a piece is lifted from the board by polling the board positions
-            # every 100ms
-
-            # chessboard.read_board()
-            # board_status, board = chessboard.get_board()
-            # if board_status != simulated_board_status:
-            #     io_expander_interrupt_flag = True
-            #     simulated_board_status = board_status
-            #     print("Simulated IO Expander interrupt")
-
-            if io_expander_interrupt_flag and game_in_progress:
-                io_expander_interrupt_flag = False
-                print("IO Expander interrupt")
-                chessboard.read_board()
-                board_status, board = chessboard.get_board()
-
-                print(
-                    "Potential castle: %s, Is castling: %s, Castling Complete: %s, Finishing Castle Move: %s"
-                    % (
-                        potential_castle,
-                        is_castling,
-                        castling_complete_flag,
-                        finish_castling_flag,
-                    )
-                )
-
-                print(
-                    "Potential En Passant: %s, Potential Promotion: %s" % (potential_en_passant, potential_promotion)
+                    if DEBUG:
+                        print_board()
+                        print("turn:", game.turn)
+                        print(game)
+
+            if board_changed and game_in_progress:
+                if DEBUG:
+                    print("IO Expander interrupt")
+
+                # Squares emptied since the last pass, computed once per board change.
+                # X ^ (X & board_status) is X & ~board_status without building a
+                # negative bigint, as in show_fix_board_diff.
+                lifted = prev_board_status ^ (prev_board_status & board_status)
+                num_pieces = chessboard.piece_count
+                # Player is replaying the CPU/remote move shown on the LEDs
+                cpu_move_pending = (
+                    game_mode == MODE_VS_CPU
+                    and game.turn == cpu_2p_remote_side
+                    and uci_player_wait_flag
+                    and cpu_2p_remote_has_moved
                 )
 
-                delta_positions = chessboard.delta_board_positions(prev_board_status, board_status)
-                print("delta_positions: %d" % delta_positions)
-
-                if delta_positions > 1:
-                    if potential_castle and delta_positions <= 4:
-                        print("More than two positions changed, but castling is possible")
-                    elif delta_positions == 2 and capture_flag:
-                        print("Two positions changed, capture is possible")
-                    elif delta_positions == 3 and potential_en_passant:
-                        print("Three positions changed, potential en passant")
-                    elif delta_positions > 2:
-                        print("More than two positions changed, force board reconfiguration")
-                        force_fix_board_flag = True
-
-                if not position_changed_flag and board_status != prev_board_status and not force_fix_board_flag:
-                    position_changed_flag = True
-                    print("board position changed")
-
-                if position_changed_flag and not force_fix_board_flag and finish_castling_flag:
-                    print("Waiting for castling to finish")
-
-                    # Check if king has been relifted from board, if so, cancel castling
-                    if delta_positions == 1:
-                        print("King has been relifted, cancelling castling")
-                        finish_castling_flag = False
-                        potential_castle = False
-                        is_castling = False
-                        castling_side = None
-                        potential_castle = True
-                        move_complete_flag = False
-
-                    # Check if rook has been moved and king is still on board, if so, finish castling
-                    if delta_positions == 4:
-                        in_castle_position = chessboard.check_castling_positions(
-                            game.turn, castling_side, board_status
-                        )
-                        print("in_castle_position: %s" % in_castle_position)
-                        if in_castle_position:
-                            print("Rook has moved into position")
-                            finish_castling_flag = True
-                            move_complete_flag = True
-                            nextion_page = "page %d" % game_progress_page_id
-                            await tft.send_command(nextion_page)
-                            print("Castling complete")
-                            castling_complete_flag = True
-                            print("Waiting for button press to confirm move")
-                            final_move_board_status = board_status
-                            final_num_pieces = chessboard.count_pieces(board_status)
-                            final_move = chessboard.get_castling_move(game.turn, castling_side)
-                            print("Final move: %s-%s" % final_move)
-
+                # A piece lifted and set back down on its own square is the most common
+                # board change, so settle it before the delta and move detection below
                 if (
-                    position_changed_flag
+                    board_status == prev_board_status
+                    and position_changed_flag
                     and not force_fix_board_flag
                     and not finish_castling_flag
                     and not is_promoting
                 ):
-                    num_pieces = chessboard.count_pieces(board_status)
-                    if num_pieces < curr_pieces:
+                    if DEBUG:
+                        print("Piece moved back to original position")
+                    final_move_board_status = board_status
+                    final_num_pieces = curr_pieces = num_pieces
+                    final_move = move_notation = original_position = None
+                    move_complete_flag = position_changed_flag = False
+                    potential_castle = is_castling = False
+                    # Reset piece tracking
+                    piece_removed = capture_flag = False
+                    board_state_piece_lifted = board_state_capturing_piece = board_state_captured_piece = 0
+                    if DEBUG:
+                        print_board()
+                    if cpu_move_pending:
+                        chessboard_led.show_interim_move(uci_move, game.turn)
+                    else:
+                        chessboard_led.show_occupied_squares(chessboard)
+                else:
+                    if DEBUG:
+                        print(
+                            "Potential castle: %s, Is castling: %s, Castling Complete: %s, Finishing Castle Move: %s"
+                            % (
+                                potential_castle,
+                                is_castling,
+                                castling_complete_flag,
+                                finish_castling_flag,
+                            )
+                        )
 
-                        # First piece lifted
+                    if DEBUG:
+                        print(
+                            "Potential En Passant: %s, Potential Promotion: %s"
+                            % (potential_en_passant, potential_promotion)
+                        )
 
-                        # if curr_pieces - num_pieces == 1 and is_castling and potential_castle:
-                        #     print("Rook moved during castling")
-                        if curr_pieces - num_pieces == 1 and move_complete_flag and not capture_flag:
-                            piece_coordinate = chessboard.coord_to_algebraic(
-                                (final_move_board_status & (board_status ^ INVERSE_MASK))
-                            )
-                            print(
-                                "Piece lifted: %s, Current move: %s, Origin square: %s"
-                                % (piece_coordinate, final_move, origin_square)
-                            )
-                            if piece_coordinate == final_move[1]:
-                                chessboard_led.show_legal_moves(final_move[0], legal_moves, game)
-                            else:
-                                chessboard_led.show_illegal_piece_lifted(piece_coordinate, game)
-                        elif curr_pieces - num_pieces == 1 and not capture_flag and not move_complete_flag:
-                            piece_removed = True
-                            piece_coordinate = chessboard.coord_to_algebraic(
-                                (prev_board_status & (board_status ^ INVERSE_MASK))
-                            )
-                            print("Piece lifted: %s" % piece_coordinate)
-                            board_state_piece_lifted = board_status
-                            index = chessboard.algebraic_to_board_index(piece_coordinate)
-                            piece_identifier = game.identify_piece(piece_coordinate)
-                            piece_status = game.is_friendly(index, game.turn)
-
-                            if piece_status and piece_identifier in "Pp":
-                                if game.can_promote(piece_coordinate):
-                                    print("Potential promotion")
-                                    potential_promotion = True
-                                else:
-                                    potential_promotion = False
+                    delta_positions = delta_board_positions(prev_board_status, board_status)
+                    if DEBUG:
+                        print("delta_positions:", delta_positions)
+
+                    if delta_positions > 1:
+                        if potential_castle and delta_positions <= 4:
+                            if DEBUG:
+                                print("More than two positions changed, but castling is possible")
+                        elif delta_positions == 2 and capture_flag:
+                            if DEBUG:
+                                print("Two positions changed, capture is possible")
+                        elif delta_positions == 3 and potential_en_passant:
+                            if DEBUG:
+                                print("Three positions changed, potential en passant")
+                        elif delta_positions > 2:
+                            if DEBUG:
+                                print("More than two positions changed, force board reconfiguration")
+                            force_fix_board_flag = True
+
+                    if not position_changed_flag and board_status != prev_board_status and not force_fix_board_flag:
+                        position_changed_flag = True
+                        if DEBUG:
+                            print("board position changed")
+
+                    if position_changed_flag and not force_fix_board_flag and finish_castling_flag:
+                        if DEBUG:
+                            print("Waiting for castling to finish")
+
+                        # Check if king has been relifted from board, if so, cancel castling
+                        if delta_positions == 1:
+                            if DEBUG:
+                                print("King has been relifted, cancelling castling")
+                            finish_castling_flag = False
+                            potential_castle = False
+                            is_castling = False
+                            castling_side = None
+                            potential_castle = True
+                            move_complete_flag = False
 
-                            if piece_identifier in "Kk":
-                                print("King lifted")
-                                if game.can_king_castle(game.turn):
-                                    print("Potential Castle")
-                                    potential_castle = True
-                                else:
-                                    print("No potential castle")
-                                    potential_castle = False
-
-                            if (
-                                game_mode == MODE_VS_CPU
-                                and game.turn == cpu_2p_remote_side
-                                and uci_player_wait_flag
-                                and cpu_2p_remote_has_moved
-                            ):
-                                if potential_castle and piece_coordinate[:2] in ["e1", "e8"]:
-                                    print("Castling move matches CPU move")
-                                elif piece_coordinate[:2] == uci_move[:2]:
-                                    print("Piece lifted matches CPU move")
-                                    chessboard_led.show_cpu_remote_move(uci_move, game.turn)
-                                else:
-                                    print("Piece lifted does not match CPU move")
+                        # Check if rook has been moved and king is still on board, if so, finish castling
+                        if delta_positions == 4:
+                            in_castle_position = chessboard.check_castling_positions(
+                                game.turn, castling_side, board_status
+                            )
+                            if DEBUG:
+                                print("in_castle_position:", in_castle_position)
+                            if in_castle_position:
+                                if DEBUG:
+                                    print("Rook has moved into position")
+                                finish_castling_flag = True
+                                move_complete_flag = True
+                                nextion_page = "page %d" % game_progress_page_id
+                                await send_command(nextion_page)
+                                if DEBUG:
+                                    print("Castling complete")
+                                castling_complete_flag = True
+                                if DEBUG:
+                                    print("Waiting for button press to confirm move")
+                                final_move_board_status = board_status
+                                final_num_pieces = num_pieces
+                                final_move = chessboard.get_castling_move(game.turn, castling_side)
+                                if DEBUG:
+                                    print("Final move: %s-%s" % final_move)
+
+                    if (
+                        position_changed_flag
+                        and not force_fix_board_flag
+                        and not finish_castling_flag
+                        and not is_promoting
+                    ):
+                        if num_pieces < curr_pieces:
+                            pieces_lifted = curr_pieces - num_pieces
+
+                            # First piece lifted
+                            if pieces_lifted == 1:
+                                # if is_castling and potential_castle:
+                                #     print("Rook moved during castling")
+                                if move_complete_flag and not capture_flag:
+                                    piece_coordinate = coord_to_algebraic(
+                                        final_move_board_status ^ (final_move_board_status & board_status)
+                                    )
+                                    if DEBUG:
+                                        print(
+                                            "Piece lifted: %s, Current move: %s, Origin square: %s"
+                                            % (piece_coordinate, final_move, origin_square)
+                                        )
+                                    if piece_coordinate == final_move[1]:
+                                        chessboard_led.show_legal_moves(final_move[0], legal_moves, game)
+                                    else:
+                                        chessboard_led.show_illegal_piece_lifted(piece_coordinate, game)
+                                elif not capture_flag and not move_complete_flag:
+                                    piece_removed = True
+                                    piece_coordinate = coord_to_algebraic(lifted)
+                                    if DEBUG:
+                                        print("Piece lifted:", piece_coordinate)
+                                    board_state_piece_lifted = board_status
+                                    index = algebraic_to_board_index(piece_coordinate)
+                                    piece_identifier = game[index]
+                                    piece_status = game.is_friendly(index, game.turn)
+
+                                    if piece_status and piece_identifier in "Pp":
+                                        if game.can_promote(piece_coordinate):
+                                            if DEBUG:
+                                                print("Potential promotion")
+                                            potential_promotion = True
+                                        else:
+                                            potential_promotion = False
+
+                                    if piece_identifier in "Kk":
+                                        if DEBUG:
+                                            print("King lifted")
+                                        if game.can_king_castle(game.turn):
+                                            if DEBUG:
+                                                print("Potential Castle")
+                                            potential_castle = True
+                                        else:
+                                            if DEBUG:
+                                                print("No potential castle")
+                                            potential_castle = False
+
+                                    if cpu_move_pending:
+                                        if potential_castle and piece_coordinate[:2] in ("e1", "e8"):
+                                            if DEBUG:
+                                                print("Castling move matches CPU move")
+                                        elif piece_coordinate[:2] == uci_move[:2]:
+                                            if DEBUG:
+                                                print("Piece lifted matches CPU move")
+                                            chessboard_led.show_cpu_remote_move(uci_move, game.turn)
+                                        else:
+                                            if DEBUG:
+                                                print("Piece lifted does not match CPU move")
+                                            chessboard_led.show_illegal_piece_lifted(piece_coordinate, game)
+                                    elif piece_status:
+                                        if DEBUG:
+                                            print("Friendly piece lifted")
+                                        origin_square = index
+                                        legal_moves = game.get_legal_moves(origin_square)
+                                        chessboard_led.show_legal_moves(piece_coordinate, legal_moves, game)
+                                        if game.enpassant != "-":
+                                            if DEBUG:
+                                                print("enpassant:", game.enpassant)
+                                                print("Enpassant move is possible")
+                                            potential_en_passant = True
+                                        else:
+                                            potential_en_passant = False
+                                    else:
+                                        if DEBUG:
+                                            print("Enemy piece lifted")
+                                        chessboard_led.show_illegal_piece_lifted(piece_coordinate, game)
+
+                            # Second piece lifted
+                            elif pieces_lifted == 2:
+                                if move_complete_flag and capture_flag:
+                                    piece_coordinate = coord_to_algebraic(
+                                        final_move_board_status ^ (final_move_board_status & board_status)
+                                    )
+                                    if DEBUG:
+                                        print("Piece lifted:", piece_coordinate)
                                     chessboard_led.show_illegal_piece_lifted(piece_coordinate, game)
-                            elif piece_status:
-                                print("Friendly piece lifted")
-                                origin_square = algebraic_to_board_index(piece_coordinate)
-                                legal_moves = game.get_legal_moves(origin_square)
-                                chessboard_led.show_legal_moves(piece_coordinate, legal_moves, game)
-                                if game.enpassant != "-":
-                                    print("enpassant: %s" % game.enpassant)
-                                    print("Enpassant move is possible")
-                                    potential_en_passant = True
                                 else:
-                                    potential_en_passant = False
-                            else:
-                                print("Enemy piece lifted")
-                                chessboard_led.show_illegal_piece_lifted(piece_coordinate, game)
-
-                        # Second piece lifted
-                        elif curr_pieces - num_pieces == 2 and move_complete_flag and capture_flag:
-                            piece_coordinate = chessboard.coord_to_algebraic(
-                                (final_move_board_status & (board_status ^ INVERSE_MASK))
-                            )
-                            print("Piece lifted: %s" % piece_coordinate)
-                            chessboard_led.show_illegal_piece_lifted(piece_coordinate, game)
-                        elif curr_pieces - num_pieces == 2:
-                            print("Two pieces lifted")
-                            piece_coordinate = chessboard.coord_to_algebraic(
-                                (board_state_piece_lifted & (board_status ^ INVERSE_MASK))
+                                    if DEBUG:
+                                        print("Two pieces lifted")
+                                    piece_coordinate = coord_to_algebraic(
+                                        board_state_piece_lifted ^ (board_state_piece_lifted & board_status)
+                                    )
+                                    if DEBUG:
+                                        print("Piece lifted:", piece_coordinate)
+                                    if piece_coordinate is None:
+                                        if DEBUG:
+                                            print("Unknown piece lifted, bailing")
+                                        force_fix_board_flag = True
+                                    else:
+                                        index = algebraic_to_board_index(piece_coordinate)
+                                        piece_status = game.is_friendly(index, game.turn)
+                                        if piece_status:
+                                            if DEBUG:
+                                                print("Friendly piece lifted")
+                                        else:
+                                            if DEBUG:
+                                                print("Enemy piece lifted")
+
+                                        if piece_status:
+                                            if DEBUG:
+                                                print("Two friendly pieces lifted, bail out")
+                                            chessboard_led.show_illegal_piece_lifted(piece_coordinate, game)
+                                        elif not piece_status:
+                                            capture_flag = True
+                                            if DEBUG:
+                                                print("Capture detected:", piece_coordinate)
+                                            board_state_capturing_piece = board_state_piece_lifted
+                                            board_state_captured_piece = board_status
+                        piece_diff = num_pieces - curr_pieces
+                        if DEBUG:
+                            print(
+                                "Piece diff: %s, Piece removed: %s, Capture detected: %s, move_complete_flag: %s, game_mode: %s"
+                                % (
+                                    piece_diff,
+                                    piece_removed,
+                                    capture_flag,
+                                    move_complete_flag,
+                                    game_mode,
+                                )
                             )
-                            print("Piece lifted: %s" % piece_coordinate)
-                            if piece_coordinate is None:
-                                print("Unknown piece lifted, bailing")
-                                force_fix_board_flag = True
-                            else:
-                                index = chessboard.algebraic_to_board_index(piece_coordinate)
-                                piece_status = game.is_friendly(index, game.turn)
-                                if piece_status:
-                                    print("Friendly piece lifted")
-                                else:
-                                    print("Enemy piece lifted")
 
-                                if piece_status:
-                                    print("Two friendly pieces lifted, bail out")
-                                    chessboard_led.show_illegal_piece_lifted(piece_coordinate, game)
-                                elif not piece_status:
-                                    capture_flag = True
-                                    print(
-                                        "Capture detected: %s"
-                                        % chessboard.coord_to_algebraic(
-                                            (board_state_piece_lifted & (board_status ^ INVERSE_MASK))
-                                        )
+                        if DEBUG:
+                            print("1227 board status:", board_status)
+                        if piece_diff == 0:
+                            is_legal_move = False
+                            # Detected once here for both the CPU-remote and the local player checks
+                            move = detect_move_positions(prev_board_status, board_status)
+                            if cpu_move_pending:
+                                if DEBUG:
+                                    print("CPU move")
+                                    print("Move: %s-%s" % move)
+                                if potential_castle and piece_identifier in "Kk":
+                                    castling_side = None
+                                    if game.can_king_castle(game.turn):
+                                        if DEBUG:
+                                            print("King may castle")
+                                        if move[1] in ("g1", "g8", "c1", "c8"):
+                                            if DEBUG:
+                                                print("The move is a castling move")
+                                            is_castling = True
+                                            castling_complete_flag = False
+                                            castling_side = "K" if move[1] in ("g1", "g8") else "Q"
+                                        else:
+                                            if DEBUG:
+                                                print("The move is not a castling move")
+                                            is_legal_move = uci_move[2:] == move[1]
+                                            if DEBUG:
+                                                print("Move matches CPU move")
+                                    else:
+                                        if move[1] in ("g1", "g8", "c1", "c8"):
+                                            if DEBUG:
+                                                print("The move is a castling move but the king cannot castle")
+                                            is_legal_move = False
+                                        else:
+                                            if DEBUG:
+                                                print("The move is not a castling move")
+                                            is_legal_move = uci_move[2:] == move[1]
+                                            if DEBUG:
+                                                print("Move matches CPU move")
+
+                                    in_castle_position = chessboard.check_castling_positions(
+                                        game.turn, castling_side, board_status
                                     )
-                                    board_state_capturing_piece = board_state_piece_lifted
-                                    board_state_captured_piece = board_status
-                    piece_diff = num_pieces - curr_pieces
-                    print(
-                        "Piece diff: %s, Piece removed: %s, Capture detected: %s, move_complete_flag: %s, game_mode: %s"
-                        % (
-                            piece_diff,
-                            piece_removed,
-                            capture_flag,
-                            move_complete_flag,
-                            game_mode,
-                        )
-                    )
 
-                    print("1227 board status: %s" % board_status)
-                    #
-                    if board_status != prev_board_status and piece_diff == 0:
-                        is_legal_move = False
-                        if (
-                            game_mode == MODE_VS_CPU
-                            and game.turn == cpu_2p_remote_side
-                            and uci_player_wait_flag
-                            and cpu_2p_remote_has_moved
-                        ):
-                            move = chessboard.detect_move_positions(prev_board_status, board_status)
-                            print("CPU move")
-                            print("Move: %s-%s" % move)
-                            if potential_castle and piece_identifier in "Kk":
-                                castling_side = None
-                                if game.can_king_castle(game.turn):
-                                    print("King may castle")
-                                    if move[1] in ["g1", "g8", "c1", "c8"]:
-                                        print("The move is a castling move")
-                                        is_castling = True
-                                        castling_complete_flag = False
-                                        castling_side = "K" if move[1] in ["g1", "g8"] else "Q"
-                                    else:
-                                        print("The move is not a castling move")
-                                        is_legal_move = uci_move[2:] == move[1]
+                                    if in_castle_position:
+                                        if DEBUG:
+                                            print("UCI: The king and rook is in the castling position")
+                                        is_legal_move = True
+                                elif uci_move[2:] == move[1]:
+                                    if DEBUG:
                                         print("Move matches CPU move")
+                                    is_legal_move = True
                                 else:
-                                    if move[1] in ["g1", "g8", "c1", "c8"]:
-                                        print("The move is a castling move but the king cannot castle")
-                                        is_legal_move = False
-                                    else:
-                                        print("The move is not a castling move")
-                                        is_legal_move = uci_move[2:] == move[1]
-                                        print("Move matches CPU move")
-
-                                in_castle_position = chessboard.check_castling_positions(
-                                    game.turn, castling_side, board_status
-                                )
+                                    if DEBUG:
+                                        print("Move does not match CPU move")
+                                    chessboard_led.show_illegal_piece_lifted(piece_coordinate, game)
+                            # Handle equal pieces Move
+                            else:
+                                if DEBUG:
+                                    print("Equal number of pieces move")
+                                move_notation = "%s-%s" % move
+                                if DEBUG:
+                                    print("Legal moves:", legal_moves)
+
+                                if (
+                                    potential_promotion
+                                    and piece_identifier in "Pp"
+                                    and game.is_promotion(move_notation)
+                                    and not finish_promotion_select_flag
+                                ):
+                                    if DEBUG:
+                                        print("Pawn promotion detected")
+                                        print("Waiting for the promotion piece to be selected")
+                                    is_promoting = True
+                                    promotion_complete_flag = False
+                                    finish_promotion_select_flag = True
+                                    move_notation += "=%s" % promotion_piece
+                                    await send_command("page promotion")
+                                    is_legal_move = True
 
-                                if in_castle_position:
-                                    print("UCI: The king and rook is in the castling position")
+                                elif move_notation in legal_moves:
+                                    if DEBUG:
+                                        print("Move is legal")
                                     is_legal_move = True
-                            elif uci_move[2:] == move[1]:
-                                print("Move matches CPU move")
-                                is_legal_move = True
-                            else:
-                                print("Move does not match CPU move")
-                                chessboard_led.show_illegal_piece_lifted(piece_coordinate, game)
-                        # Handle equal pieces Move
-                        else:
-                            print("Equal number of pieces move")
-                            move = chessboard.detect_move_positions(prev_board_status, board_status)
-                            move_notation = "%s-%s" % move
-                            print("Legal moves: %s" % legal_moves)
-
-                            if (
-                                potential_promotion
-                                and piece_identifier in "Pp"
-                                and game.is_promotion(move_notation)
-                                and not finish_promotion_select_flag
-                            ):
-                                print("Pawn promotion detected")
-                                print("Waiting for the promotion piece to be selected")
-                                is_promoting = True
-                                promotion_complete_flag = False
-                                finish_promotion_select_flag = True
-                                move_notation += "=%s" % promotion_piece
-                                await tft.send_command("page promotion")
-                                is_legal_move = True
 
-                            elif move_notation in legal_moves:
-                                print("Move is legal")
-                                is_legal_move = True
+                                if potential_castle and piece_identifier in "Kk":
+                                    castling_side = None
+                                    if game.can_king_castle(game.turn):
+                                        if DEBUG:
+                                            print("King may castle")
+                                        if move[1] in ("g1", "g8", "c1", "c8"):
+                                            if DEBUG:
+                                                print("The move is a castling move")
+                                            is_castling = True
+                                            castling_complete_flag = False
+                                            castling_side = "K" if move[1] in ("g1", "g8") else "Q"
+                                    else:
+                                        if DEBUG:
+                                            print("King may not castle")
+                                        is_legal_move = False
 
-                            if potential_castle and piece_identifier in "Kk":
-                                castling_side = None
-                                if game.can_king_castle(game.turn):
-                                    print("King may castle")
-                                    if move[1] in ["g1", "g8", "c1", "c8"]:
-                                        print("The move is a castling move")
-                                        is_castling = True
+                                    in_castle_position = chessboard.check_castling_positions(
+                                        game.turn, castling_side, board_status
+                                    )
+
+                                    if in_castle_position:
+                                        if DEBUG:
+                                            print("The king and rook is in the castling position")
+                                        is_legal_move = True
+
+                            if is_legal_move:
+                                if DEBUG:
+                                    print("Move completed")
+
+                                if (
+                                    potential_castle
+                                    and is_castling
+                                    and not castling_complete_flag
+                                    and not finish_castling_flag
+                                ):
+                                    if DEBUG:
+                                        print("Move recognized as castling")
+                                    if chessboard.check_castling_positions(game.turn, castling_side, board_status):
+                                        move_notation = "O-O" if castling_side == "K" else "O-O-O"
+                                        if DEBUG:
+                                            print("move:", move_notation)
+                                            print("Waiting for the rook to be moved in place for castling")
+                                        await send_command("page finish_castle")
                                         castling_complete_flag = False
-                                        castling_side = "K" if move[1] in ["g1", "g8"] else "Q"
+                                        finish_castling_flag = True
+                                        if game.turn == "w":
+                                            move_notation = "h1-f1" if castling_side == "K" else "a1-d1"
+                                        else:
+                                            move_notation = "h8-f8" if castling_side == "K" else "a8-d8"
+                                        chessboard_led.show_interim_move(move_notation, game.turn)
                                 else:
-                                    print("King may not castle")
-                                    is_legal_move = False
-
-                                in_castle_position = chessboard.check_castling_positions(
-                                    game.turn, castling_side, board_status
-                                )
-
-                                if in_castle_position:
-                                    print("The king and rook is in the castling position")
-                                    is_legal_move = True
-
-                        if is_legal_move:
-                            print("Move completed")
-
-                            if (
-                                potential_castle
-                                and is_castling
-                                and not castling_complete_flag
-                                and not finish_castling_flag
-                            ):
-                                print("Move recognized as castling")
-                                if chessboard.check_castling_positions(game.turn, castling_side, board_status):
-                                    move_notation = "O-O" if castling_side == "K" else "O-O-O"
-                                    print("move: %s" % move_notation)
-                                    print("Waiting for the rook to be moved in place for castling")
-                                    await tft.send_command("page finish_castle")
-                                    castling_complete_flag = False
-                                    finish_castling_flag = True
-                                    if game.turn == "w":
-                                        move_notation = "h1-f1" if castling_side == "K" else "a1-d1"
+                                    move_complete_flag = True
+                                    # move was detected at the top of this branch; format it once
+                                    if is_promoting and promotion_complete_flag:
+                                        move_notation = "%s-%s=%s" % (move[0], move[1], promotion_piece)
                                     else:
-                                        move_notation = "h8-f8" if castling_side == "K" else "a8-d8"
+                                        move_notation = "%s-%s" % move
+                                    original_position = move[0]
+                                    if DEBUG:
+                                        print(move_notation)
+                                        print("Waiting for button press to confirm move")
+                                    final_move_board_status = board_status
+                                    final_num_pieces = num_pieces
+                                    final_move = move
                                     chessboard_led.show_interim_move(move_notation, game.turn)
                             else:
-                                move_complete_flag = True
-                                move = chessboard.detect_move_positions(prev_board_status, board_status)
-                                if is_promoting and promotion_complete_flag:
-                                    move_notation = "%s-%s" % move
+                                if DEBUG:
+                                    print("Move is illegal")
+                                chessboard_led.show_illegal_piece_lifted(piece_coordinate, game)
+
+                        # Captured piece removed from board and replaced with the capturing piece
+                        elif piece_diff == -1 and capture_flag and piece_removed:
+                            if DEBUG:
+                                print("Piece captured")
+                            move = detect_capture_move_positions(
+                                prev_board_status,
+                                board_state_capturing_piece,
+                                board_state_captured_piece,
+                            )
+                            if DEBUG:
+                                print("Piece identifier:", piece_identifier)
+
+                            if potential_promotion and piece_identifier in "Pp":
+                                if DEBUG:
+                                    print("Pawn promotion detected")
+                                move_notation = "%sx%s" % move
+                                if game.is_promotion(move_notation) and not finish_promotion_select_flag:
+                                    if DEBUG:
+                                        print("Capturing move is also recognized as promotion")
+                                        print("Waiting for the promotion piece to be selected")
+                                    is_promoting = True
+                                    promotion_complete_flag = False
+                                    finish_promotion_select_flag = True
                                     move_notation += "=%s" % promotion_piece
+                                    await send_command("page promotion")
+                            elif potential_en_passant:
+                                if chessboard.check_en_passant_positions(game.turn, game.enpassant):
+                                    if DEBUG:
+                                        print("En passant move")
+                                    move_notation = "%sx%se.p." % (move[0], game.enpassant)
+                                    is_en_passant_move = True
                                 else:
-                                    move_notation = "%s-%s" % move
-                                original_position = move[0]
-                                print("%s" % move_notation)
-                                print("Waiting for button press to confirm move")
-                                final_move_board_status = board_status
-                                final_num_pieces = num_pieces
-                                final_move = move
-                                chessboard_led.show_interim_move(move_notation, game.turn)
-                        else:
-                            print("Move is illegal")
-                            chessboard_led.show_illegal_piece_lifted(piece_coordinate, game)
-
-                    # Captured piece removed from board and replaced with the capturing piece
-                    elif board_status != prev_board_status and piece_diff == -1 and capture_flag and piece_removed:
-                        print("Piece captured")
-                        move = chessboard.detect_capture_move_positions(
-                            prev_board_status,
-                            board_state_capturing_piece,
-                            board_state_captured_piece,
-                        )
-                        print("Piece identifier: %s" % piece_identifier)
-
-                        if potential_promotion and piece_identifier in "Pp":
-                            print("Pawn promotion detected")
-                            move_notation = "%sx%s" % move
-                            if game.is_promotion(move_notation) and not finish_promotion_select_flag:
-                                print("Capturing move is also recognized as promotion")
-                                print("Waiting for the promotion piece to be selected")
-                                is_promoting = True
-                                promotion_complete_flag = False
-                                finish_promotion_select_flag = True
-                                move_notation += "=%s" % promotion_piece
-                                await tft.send_command("page promotion")
-                        elif potential_en_passant:
-                            if chessboard.check_en_passant_positions(game.turn, game.enpassant):
-                                print("En passant move")
-                                move_notation = "%sx%se.p." % (move[0], game.enpassant)
-                                is_en_passant_move = True
+                                    if DEBUG:
+                                        print("Potential en passant, but not doing the en passant move")
+                                    move_notation = "%sx%s" % move
                             else:
-                                print("Potential en passant, but not doing the en passant move")
                                 move_notation = "%sx%s" % move
-                        else:
-                            move_notation = "%sx%s" % move
-                        original_position = move[0]
-                        print("%s" % move_notation)
-                        print("Waiting for button press to confirm move")
-                        final_move_board_status = board_status
-                        final_num_pieces = num_pieces
-                        final_move = move
-                        final_move_notation = move_notation
-                        chessboard_led.show_interim_move(move_notation, game.turn)
-                        move_complete_flag = True
-                    elif board_status == prev_board_status:
-                        print("Piece moved back to original position")
-                        move_complete_flag = False
-                        final_move_board_status = board_status
-                        final_num_pieces = num_pieces
-                        final_move = None
-                        move_notation = None
-                        original_position = None
-                        piece_removed = False
-                        capture_flag = False
-                        board_state_piece_lifted = 0
-                        board_state_capturing_piece = 0
-                        board_state_captured_piece = 0
-                        curr_pieces = num_pieces
-                        chessboard.print_board()
-                        position_changed_flag = False
-                        potential_castle = False
-                        is_castling = False
-                        if (
-                            game_mode == MODE_VS_CPU
-                            and game.turn == cpu_2p_remote_side
-                            and uci_player_wait_flag
-                            and cpu_2p_remote_has_moved
-                        ):
-                            chessboard_led.show_interim_move(uci_move, game.turn)
-                        else:
-                            chessboard_led.show_occupied_squares(chessboard)
+                            original_position = move[0]
+                            if DEBUG:
+                                print(move_notation)
+                                print("Waiting for button press to confirm move")
+                            final_move_board_status = board_status
+                            final_num_pieces = num_pieces
+                            final_move = move
+                            final_move_notation = move_notation
+                            chessboard_led.show_interim_move(move_notation, game.turn)
+                            move_complete_flag = True
             loop_counter += 1
             if game_in_progress:
                 if white_clock.is_clock_expired():
-                    print("White clock expired")
-                    await tft.send_command("page game_ended")
-                    await tft.set_value("t2.txt", "Time Expired")
-                    await tft.set_value("t3.txt", "Black Wins")
+                    if DEBUG:
+                        print("White clock expired")
+                    await send_batch(["page game_ended", 't2.txt="Time Expired"', 't3.txt="Black Wins"'])
                     game_result = "0-1"
                     chessboard_led.show_checkmate("w")
                     game_in_progress = False
                     game_over_flag = True
                 elif black_clock.is_clock_expired():
-                    print("Black clock expired")
-                    await tft.send_command("page game_ended")
-                    await tft.set_value("t2.txt", "Time Expired")
-                    await tft.set_value("t3.txt", "White Wins")
+                    if DEBUG:
+                        print("Black clock expired")
+                    await send_batch(["page game_ended", 't2.txt="Time Expired"', 't3.txt="White Wins"'])
                     game_result = "1-0"
                     chessboard_led.show_checkmate("b")
                     game_in_progress = False
                     game_over_flag = True
                 elif game.checkmate_flag:
-                    print("Checkmate detected")
-                    await tft.send_command("page game_ended")
-                    await tft.set_value("t2.txt", "Checkmate")
+                    if DEBUG:
+                        print("Checkmate detected")
                     winner = "White" if game.turn == "b" else "Black"
-                    await tft.set_value("t3.txt", "%s Wins" % winner)
+                    await send_batch(["page game_ended", 't2.txt="Checkmate"', 't3.txt="%s Wins"' % winner])
                     game_result = "1-0" if game.turn == "b" else "0-1"
                     chessboard_led.show_checkmate(game.turn)
                     game_in_progress = False
                     checkmate_flag = False
                     game_over_flag = True
                 elif game.stalemate_flag:
-                    print("Stalemate detected")
-                    await tft.send_command("page game_ended")
-                    await tft.set_value("t2.txt", "Stalemate")
-                    await tft.set_value("t3.txt", "Game Ends in Draw")
+                    if DEBUG:
+                        print("Stalemate detected")
+                    await send_batch(["page game_ended", 't2.txt="Stalemate"', 't3.txt="Game Ends in Draw"'])
                     game_result = "1/2-1/2"
                     chessboard_led.show_stalemate()
                     game_in_progress = False
@@ -1502,11 +1776,10 @@ async def event_listener():
                         chessboard_led.show_occupied_squares(chessboard)
                         update_led_board = False
                     game_result = "*"
-                    white_clock.update_clock()
-                    black_clock.update_clock()
 
                 if game_over_flag:
-                    print("Game over flag: %s" % game_over_flag)
+                    if DEBUG:
+                        print("Game over flag:", game_over_flag)
                     await console_move_history(
                         game.get_move_history(),
                         game.fullmove,
@@ -1517,19 +1790,32 @@ async def event_listener():
                     )
 
             # If button 0 is pressed, drop to REPL
-            if repl_button.value() == 0:
-                print("Dropping to REPL")
+            if repl_button_value() == 0:
+                if DEBUG:
+                    print("Dropping to REPL")
                 sys.exit()
 
-        # Update luminosity
-        lvl = light_sensor.lux_calc()
-        min_lvl = prev_lux / 1.05
-        max_lvl = prev_lux * 1.05
-        if lvl >= max_lvl or lvl <= min_lvl:
-            chessboard_led.set_lux(lvl)
-        prev_lux = lvl
-
-        await uasyncio.sleep_ms(50)
+        # Drain a backlog of Nextion events without the idle delay, yielding to
+        # other tasks in between and capping the burst to stay fair
+        if queue_size() and event_burst < MAX_EVENT_BURST:
+            event_burst += 1
+            await sleep_ms(0)
+        else:
+            event_burst = 0
+            # The clocks and tests run in their own tasks, so only engine searches
+            # need the short tick; otherwise sleep longer if touches can wake us.
+            # Touches, board changes and buttons all set event_flag, so outside a
+            # game nothing else needs the loop to run
+            if (game_in_progress and game_mode == MODE_VS_CPU) or not rx_wakeup:
+                tick_ms = EVENT_TICK_MS
+            elif game_in_progress:
+                tick_ms = IDLE_TICK_MS
+            else:
+                tick_ms = MENU_TICK_MS
+            try:
+                await wait_for_ms(event_wait(), tick_ms)
+            except timeout_error:
+                pass
 
 
 async def initialize():
@@ -1551,31 +1837,37 @@ async def initialize():
 def io_expander_callback(pin):
     global io_expander_interrupt_flag
     io_expander_interrupt_flag = True
+    event_flag.set()
+
+
+def uart_callback(uart):
+    event_flag.set()
 
 
 def button_callback(pin):
     global button_interrupt_flag, button_interrupt_id
     button_interrupt_flag = True
     button_interrupt_id = pin
+    event_flag.set()
 
 
 async def main():
-    global uart, tft, sd_card_detect, sd_card_mounted
-    global i2c, i2c_mux, chessboard, board, board_status
+    global uart, uart_rx_wakeup, tft, sd_card_detect, sd_card_mounted, game_counter
+    global i2c, i2c_mux, chessboard, board_status
     global chessboard_led, white_clock, black_clock, light_sensor
 
-    # # Delay for three seconds to allow drop into REPL
-    # count = 0
-    # print("Starting in 3 seconds...")
-    # while count <= 15:
-    #     # If button 0 is pressed, drop to REPL
-    #     if repl_button.value() == 0:
-    #         print("Dropping to REPL")
-    #         sys.exit()
-    #
-    #     # Do nothing
-    #     count += 1
-    #     await uasyncio.sleep_ms(200)
+    # Wait up to three seconds for button 0 to be pressed to drop into REPL
+    print("Starting in 3 seconds...")
+    repl_flag = uasyncio.ThreadSafeFlag()
+    repl_button.irq(trigger=machine.Pin.IRQ_FALLING, handler=lambda pin: repl_flag.set())
+    try:
+        await uasyncio.wait_for_ms(repl_flag.wait(), 3000)
+        print("Dropping to REPL")
+        sys.exit()
+    except uasyncio.TimeoutError:
+        pass
+    finally:
+        repl_button.irq(handler=None)
 
     # Set up SD Card if card is detected
     if not sd_card_detect.value():
@@ -1588,6 +1880,7 @@ async def main():
                 print("SD Card mounted")
                 print(os.listdir("/sd"))
                 sd_card_mounted = True
+                game_counter = load_game_counter()
             except OSError as e:
                 print("SD Card mount failed: %s" % e)
 
@@ -1611,7 +1904,7 @@ async def main():
     # Set up chessboard
     chessboard = Chessboard(i2c, chessboard_gpio_addr, led_strip)
     chessboard.read_board()
-    board_status, board = chessboard.get_board()
+    board_status = chessboard.get_board_status()
 
     # Set up ambient light sensor
     light_sensor = AmbientLightSensor(i2c)
@@ -1628,9 +1921,15 @@ async def main():
     print("LED show occupied squares")
     chessboard_led.show_occupied_squares(chessboard)
 
-    # Set up interrupters
-    io_interrupt.irq(trigger=machine.Pin.IRQ_FALLING, handler=io_expander_callback)
-    print("%s interrupt set up, current state: %s" % (io_interrupt, io_interrupt.value()))
+    # Set up interrupters. Board changes are interrupt driven; polling is only
+    # a fallback for when the IO expander interrupt cannot be attached.
+    try:
+        io_interrupt.irq(trigger=machine.Pin.IRQ_FALLING, handler=io_expander_callback)
+        io_expander_polling = False
+        print("%s interrupt set up, current state: %s" % (io_interrupt, io_interrupt.value()))
+    except Exception as e:
+        io_expander_polling = True
+        print("IO expander interrupt unavailable, polling the board instead: %s" % e)
 
     # Set up interrupter for tactile switch
     button_white.irq(trigger=machine.Pin.IRQ_FALLING, handler=button_callback)
@@ -1641,6 +1940,10 @@ async def main():
 
     uart = machine.UART(1, 115200, tx=33, rx=32)
     uart.init(115200, bits=8, parity=None, stop=1, rxbuf=1024, txbuf=1024)
+    # Wake the event listener when a Nextion packet arrives, on ports that support it
+    if hasattr(machine.UART, "IRQ_RXIDLE"):
+        uart.irq(handler=uart_callback, trigger=machine.UART.IRQ_RXIDLE)
+        uart_rx_wakeup = True
     print("UART initialized")
     tft = nextion.Nextion(uart, lock, queue)
     print("Nextion instance created")
@@ -1650,9 +1953,16 @@ async def main():
     await uasyncio.create_task(initialize())
     print("Initialization complete")
 
+    uasyncio.create_task(clock_ticker([white_clock, black_clock]))
+    uasyncio.create_task(lux_ticker(light_sensor, chessboard_led))
+    if io_expander_polling:
+        uasyncio.create_task(io_expander_poll(chessboard))
+
     print("Starting main loop")
     loop = uasyncio.get_event_loop()
     try:
-        loop.run_until_complete(event_listener())
+        loop.run_until_complete(
+            event_listener(tft, rtc, chessboard, chessboard_led, white_clock, black_clock, light_sensor)
+        )
     finally:
         loop.close()
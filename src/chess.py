@@ -58,14 +58,26 @@ import sys
 
 if sys.implementation.name == "micropython":
     import ure
+    from micropython import const
 else:
     import re as ure
 
+    def const(x):
+        return x
+
+
 RANK = ["1", "2", "3", "4", "5", "6", "7", "8"]
 FILE = ["a", "b", "c", "d", "e", "f", "g", "h"]
 PROMOTED_PIECES = ["N", "B", "R", "Q"]
 MOVE_NOTATION_REGEX = r"([a-h][1-8])?([-x])?([a-h][1-8])(=?[NBRQnbrq])?(e\.p\.)?"
-DEBUG = 0  # 0 = no debug, 1 = debug, 2 = verbose debug
+# Compiled once; the parsers run per move, e.g. for every legal move shown on the LEDs
+MOVE_NOTATION_RE = ure.compile(MOVE_NOTATION_REGEX)
+# Long notation with the from square required, as used by the promotion checks
+LONG_NOTATION_REGEX = r"([a-h][1-8])([-x]?)([a-h][1-8])(=?[NBRQnbrq])?(e\.p\.)?"
+LONG_NOTATION_RE = ure.compile(LONG_NOTATION_REGEX)
+# 0 = no debug, 1 = debug, 2 = verbose debug. Call sites check DEBUG before
+# building the message, so release builds skip the formatting entirely.
+DEBUG = const(0)
 
 SEGOE_CHESS_FONT_PIECES_LIGHT = {
     "P": 0x70,
@@ -137,17 +149,18 @@ def validate_notation(chess_move: str) -> bool:
     :return: True if valid, False otherwise
     """
     valid = 1
-    debug("validating notation: {}".format(chess_move), 2)
-    if chess_move in ["O-O", "O-O-O"]:
+    if DEBUG:
+        debug("validating notation: {}".format(chess_move), 2)
+    if chess_move in ("O-O", "O-O-O"):
         return True
 
-    regex = ure.compile(MOVE_NOTATION_REGEX)
-    match = regex.match(chess_move)
+    match = MOVE_NOTATION_RE.match(chess_move)
     if match:
-        if sys.implementation.name != "micropython":
+        if DEBUG and sys.implementation.name != "micropython":
             debug("match: {}".format(match.groups()), 2)
         if match.group(1) is None and match.group(3) and not match.group(2):
-            print("pawn push: {}".format(match.group(3)))
+            if DEBUG:
+                print("pawn push: {}".format(match.group(3)))
             return True
         elif match.group(2) == "x" and match.group(4):
             if match.group(1) and match.group(3):
@@ -177,8 +190,9 @@ def parse_move_notation(chess_move: str) -> tuple:
     :return: tuple of from_square, to_square, capture, promotion, enpassant, castle
     """
     valid = 1
-    debug("validating notation: {}".format(chess_move), 2)
-    if chess_move in [
+    if DEBUG:
+        debug("validating notation: {}".format(chess_move), 2)
+    if chess_move in (
         "O-O",
         "O-O-O",
         "e1g1",
@@ -189,15 +203,14 @@ def parse_move_notation(chess_move: str) -> tuple:
         "e8-g8",
         "e1-c1",
         "e8-c8",
-    ]:
-        castle = "K" if chess_move in ["O-O", "e1g1", "e8g8", "e1-g1", "e8-g8"] else "Q"
+    ):
+        castle = "K" if chess_move in ("O-O", "e1g1", "e8g8", "e1-g1", "e8-g8") else "Q"
         return "O", "O", False, None, False, castle
 
-    regex = ure.compile(MOVE_NOTATION_REGEX)
-    match = regex.match(chess_move)
+    match = MOVE_NOTATION_RE.match(chess_move)
     valid_move = False
     if match:
-        if sys.implementation.name != "micropython":
+        if DEBUG and sys.implementation.name != "micropython":
             debug("match: {}".format(match.groups()), 2)
         if match.group(1) is None and match.group(3) and not match.group(2):
             valid_move = True
@@ -236,10 +249,11 @@ def algebraic_to_board_index(algebraic):
     :param algebraic: board index
     :return: board index
     """
-    if algebraic in ["O-O", "O-O-O"]:
+    if algebraic in ("O-O", "O-O-O"):
         return None
 
-    debug("algebraic to board index: {}".format(algebraic), 2)
+    if DEBUG:
+        debug("algebraic to board index: {}".format(algebraic), 2)
     return RANK.index(algebraic[1]) * 8 + FILE.index(algebraic[0].lower())
 
 
@@ -262,10 +276,11 @@ def check_boundary(index: int, rank: int) -> bool:
     :return: True if on the rank, False otherwise
     """
     is_in_bounds = 0 <= index < 64 and index // 8 == rank
-    debug(
-        "boundary check: index = {}, rank = {}, in bounds = {}".format(index, rank, is_in_bounds),
-        2,
-    )
+    if DEBUG:
+        debug(
+            "boundary check: index = {}, rank = {}, in bounds = {}".format(index, rank, is_in_bounds),
+            2,
+        )
     return 0 <= index < 64 and index // 8 == rank
 
 
@@ -337,6 +352,8 @@ class Chess:
     insufficient_material_flag: bool = False
     check_flag: bool = False
     game_over_flag: bool = False
+    legal_moves_cache: dict = {}  # board index -> legal moves for the current position
+    test_board: list = []  # scratch board that candidate moves are tried on
 
     def __init__(self, fen: str = None):
         """
@@ -348,6 +365,7 @@ class Chess:
 
         :return: None
         """
+        self.test_board = list(" " * 64)
         if fen:
             self.set_fen(fen)
         else:
@@ -379,6 +397,7 @@ class Chess:
         Set the character at the given board index to the given value.
         """
         self.board[index] = value
+        self.legal_moves_cache = {}
 
     def reset_board(self):
         """
@@ -409,6 +428,7 @@ class Chess:
         self.stalemate_flag = False
         self.insufficient_material_flag = False
         self.game_over_flag = False
+        self.legal_moves_cache = {}
 
         i = 8
         for rank in fen[0].split("/"):
@@ -483,7 +503,7 @@ class Chess:
                 pgn += "\n"
             notation = ["", ""]
             for j in range(2):
-                if moves[i][j] not in ["O-O", "O-O-O"]:
+                if moves[i][j] not in ("O-O", "O-O-O"):
                     move = str(moves[i][j])
                     notation[j] = move.replace("-", "")
                     notation[j] = notation[j].replace("e.p.", "")
@@ -598,8 +618,11 @@ class Chess:
 
         :return: None
         """
-        debug("Updating turn")
+        if DEBUG:
+            debug("Updating turn")
         next_turn = "b" if self.turn == "w" else "w"
+        # The board has changed, so moves cached for the previous position are stale
+        self.legal_moves_cache = {}
 
         self.check_flag = False
         self.checkmate_flag = False
@@ -607,7 +630,8 @@ class Chess:
         self.game_over_flag = False
 
         if enpassant:
-            debug("Adding en passant to the move string")
+            if DEBUG:
+                debug("Adding en passant to the move string")
             move += "e.p."
         if self.is_check(next_turn):
             self.check_flag = True
@@ -653,12 +677,13 @@ class Chess:
             else:
                 self.halfmove += 1
 
-        debug("check_flag: {}".format(self.check_flag))
-        debug("checkmate_flag: {}".format(self.checkmate_flag))
-        debug("stalemate_flag: {}".format(self.stalemate_flag))
-        debug("game_over_flag: {}".format(self.game_over_flag))
-        debug("enpassant: {}".format(self.enpassant))
-        debug("turn: {}".format(self.turn))
+        if DEBUG:
+            debug("check_flag: {}".format(self.check_flag))
+            debug("checkmate_flag: {}".format(self.checkmate_flag))
+            debug("stalemate_flag: {}".format(self.stalemate_flag))
+            debug("game_over_flag: {}".format(self.game_over_flag))
+            debug("enpassant: {}".format(self.enpassant))
+            debug("turn: {}".format(self.turn))
 
     def get_move_history(self, num_moves: int = 0):
         """
@@ -684,7 +709,7 @@ class Chess:
         if self.enpassant == "-":
             return False
 
-        if move in ["O-O", "O-O-O"]:
+        if move in ("O-O", "O-O-O"):
             return False
 
         index = algebraic_to_board_index(move[:2])
@@ -709,11 +734,10 @@ class Chess:
         :return: True if the move is a promotion, and False otherwise
         """
 
-        if move in ["O-O", "O-O-O"]:
+        if move in ("O-O", "O-O-O"):
             return False
 
-        regex = ure.compile(r"([a-h][1-8])([-x]?)([a-h][1-8])(=?[NBRQnbrq])?(e\.p\.)?")
-        match = regex.match(move)
+        match = LONG_NOTATION_RE.match(move)
         from_square = algebraic_to_board_index(match.group(1))
 
         piece = self.board[from_square]
@@ -777,11 +801,12 @@ class Chess:
         :return: None
         """
 
-        if move in ["O-O", "O-O-O"]:
+        if move in ("O-O", "O-O-O"):
             self.perform_castle(move, board=board, side=side)
 
         if self.is_enpassant(move):
-            debug("move is enpassant")
+            if DEBUG:
+                debug("move is enpassant")
             from_square = algebraic_to_board_index(move[0:2])
             to_square = algebraic_to_board_index(move[3:5])
             board[from_square] = " "
@@ -792,7 +817,8 @@ class Chess:
                 else algebraic_to_board_index(self.enpassant) + 8
             )
             board[captured_square] = " "
-            debug("enpassant move is complete")
+            if DEBUG:
+                debug("enpassant move is complete")
             return True
 
         from_square = algebraic_to_board_index(move[:2])
@@ -821,7 +847,8 @@ class Chess:
             side = self.turn
 
         index = board.index("K" if side == "w" else "k")
-        debug("make a castle move: " + move)
+        if DEBUG:
+            debug("make a castle move: " + move)
         if move == "O-O" and side == "w":
             board[6] = "K"
             board[5] = "R"
@@ -867,8 +894,7 @@ class Chess:
         if side is None:
             side = self.turn
 
-        regex = ure.compile(r"([a-h][1-8])([-x]?)([a-h][1-8])(=?[NBRQnbrq])?(e\.p\.)?")
-        match = regex.match(move)
+        match = LONG_NOTATION_RE.match(move)
         from_square = algebraic_to_board_index(match.group(1))
         to_square = algebraic_to_board_index(match.group(3))
 
@@ -894,7 +920,8 @@ class Chess:
         if not validate_notation(move):
             return False
 
-        debug("move: {}".format(move))
+        if DEBUG:
+            debug("move: {}".format(move))
 
         if not validate_notation(move):
             return False
@@ -908,7 +935,7 @@ class Chess:
             else:
                 move_formatted = move_from + "-" + move_to
 
-        if move_formatted not in ["O-O", "O-O-O"]:
+        if move_formatted not in ("O-O", "O-O-O"):
             from_square = algebraic_to_board_index(move_from)
             if (self.board[from_square].isupper() and side != "w") or (
                 self.board[from_square].islower() and side != "b"
@@ -931,32 +958,38 @@ class Chess:
             return True
 
         if self.is_promotion(move_formatted):
-            debug("move is promotion")
+            if DEBUG:
+                debug("move is promotion")
             self.perform_promotion(move)
             self.enpassant = "-"
             self.update_turn(move, promoted=True)
             return True
 
         if self.check_move(move_formatted, side):
-            debug("move is valid")
+            if DEBUG:
+                debug("move is valid")
             if move != "O-O" and move != "O-O-O":
-                debug("move is not castling")
+                if DEBUG:
+                    debug("move is not castling")
                 from_square = algebraic_to_board_index(move_from)
                 to_square = algebraic_to_board_index(move_to)
                 self.board[to_square] = self.board[from_square]
                 self.board[from_square] = " "
                 self.enpassant = "-"
                 self.update_turn(move_formatted)
-                debug("move is complete")
+                if DEBUG:
+                    debug("move is complete")
                 return True
             else:
                 self.perform_castle(move_formatted)
                 self.enpassant = "-"
                 self.update_turn(move_formatted)
-                debug("castling complete")
+                if DEBUG:
+                    debug("castling complete")
                 return True
-        debug("move is invalid, move not made")
-        debug("still {}'s move".format("white" if self.turn == "w" else "black"))
+        if DEBUG:
+            debug("move is invalid, move not made")
+            debug("still {}'s move".format("white" if self.turn == "w" else "black"))
         return False
 
     def check_move(self, move: str, side: str = "w"):
@@ -981,7 +1014,16 @@ class Chess:
         :param side: side to check
         :return: True if king can castle, False otherwise
         """
-        index = self.board.index("K") if side == "w" else self.board.index("k")
+        # Without a castling right left there is no need to generate the king moves
+        castling = self.castling
+        if side == "w":
+            if "K" not in castling and "Q" not in castling:
+                return False
+            index = self.board.index("K")
+        else:
+            if "k" not in castling and "q" not in castling:
+                return False
+            index = self.board.index("k")
         move_list = self.get_legal_moves(index)
 
         if "O-O" in move_list or "O-O-O" in move_list:
@@ -996,13 +1038,15 @@ class Chess:
         :param side: side to move
         :return: True if move is valid, False otherwise
         """
+        board = self.board
+        # Look at the king's home square directly rather than scanning for the king
         if side == "w":
-            if self.board.index("K") != 4:
+            if board[4] != "K":
                 return False
             if index == 6:
                 if "K" not in self.castling:
                     return False
-                if self.board[5] != " " or self.board[6] != " ":
+                if board[5] != " " or board[6] != " ":
                     return False
 
                 if (
@@ -1014,7 +1058,7 @@ class Chess:
             else:
                 if "Q" not in self.castling:
                     return False
-                if self.board[1] != " " or self.board[2] != " " or self.board[3] != " ":
+                if board[1] != " " or board[2] != " " or board[3] != " ":
                     return False
                 if (
                     self.is_square_attacked(2, side=side)
@@ -1023,12 +1067,12 @@ class Chess:
                 ):
                     return False
         else:
-            if self.board.index("k") != 60:
+            if board[60] != "k":
                 return False
             if index == 62:
                 if "k" not in self.castling:
                     return False
-                if self.board[61] != " " or self.board[62] != " ":
+                if board[61] != " " or board[62] != " ":
                     return False
                 if (
                     self.is_square_attacked(60, side=side)
@@ -1039,7 +1083,7 @@ class Chess:
             else:
                 if "q" not in self.castling:
                     return False
-                if self.board[57] != " " or self.board[58] != " " or self.board[59] != " ":
+                if board[57] != " " or board[58] != " " or board[59] != " ":
                     return False
                 if (
                     self.is_square_attacked(58, side=side)
@@ -1070,16 +1114,10 @@ class Chess:
             return False
 
         from_square = algebraic_to_board_index(from_square)
-        piece = self.board[from_square]
-
-        legal_moves = self.get_legal_moves(from_square)
-
-        if piece == " ":
+        if self.board[from_square] == " ":
             return False
-        if move in legal_moves:
-            return True
 
-        return False
+        return move in self.get_legal_moves(from_square)
 
     def all_legal_moves(self, color: str, shortcut=False) -> list:
         """
@@ -1106,18 +1144,25 @@ class Chess:
     def get_legal_moves(self, index: int):
         """
         Return a list of legal moves for the piece at the given index.
+        Results are cached per square until the position changes, so lifting
+        the same piece repeatedly does not regenerate its moves. The returned
+        list is shared with the cache and must not be modified.
 
         :param index: the board index
 
         :return: a list of legal moves for the piece at the given index
         """
+        moves = self.legal_moves_cache.get(index)
+        if moves is not None:
+            return moves
         piece = self.board[index]
         if piece == " ":
-            return []
+            moves = []
         else:
             moves = self.generate_moves(index)
             moves = self.remove_illegal_moves(moves)
-            return moves
+        self.legal_moves_cache[index] = moves
+        return moves
 
     def generate_moves(self, index: int):
         """
@@ -1152,7 +1197,8 @@ class Chess:
 
         :return: a list of legal pawn moves for the pawn at the given index
         """
-        debug("Generating pawn moves for index {}".format(index))
+        if DEBUG:
+            debug("Generating pawn moves for index {}".format(index))
         moves = []
         if self.board[index].isupper():
             if self.board[index + 8] == " ":
@@ -1476,42 +1522,52 @@ class Chess:
         if side is None:
             side = "w" if board[index].isupper() else "b"
 
-        debug("-----------------")
-        debug("Checking if square {} is attacked".format(index))
-        debug("friendly side:  {}".format(side))
+        if DEBUG:
+            debug("-----------------")
+            debug("Checking if square {} is attacked".format(index))
+            debug("friendly side:  {}".format(side))
+
+            debug(self.get_board(board), 2)
 
-        debug(self.get_board(board), 2)
         # check for pawns
-        debug("Checking for pawns attacks", 2)
+        if DEBUG:
+            debug("Checking for pawns attacks", 2)
         if side == "w":
             if index % 8 != 0 and index > 7 and board[index + 9] == "p":
-                debug("black pawn attack: {}".format(index + 9))
+                if DEBUG:
+                    debug("black pawn attack: {}".format(index + 9))
                 return True
             if (index + 1) % 8 != 0 and index > 7 and board[index + 7] == "p":
-                debug("black pawn attack: {}".format(index + 7))
+                if DEBUG:
+                    debug("black pawn attack: {}".format(index + 7))
                 return True
         else:
             if index % 8 != 0 and index < 56 and board[index - 7] == "P":
-                debug("white pawn attack: {}".format(index - 7))
+                if DEBUG:
+                    debug("white pawn attack: {}".format(index - 7))
                 return True
             if (index + 1) % 8 != 0 and index < 56 and board[index - 9] == "P":
-                debug("white pawn attack: {}".format(index - 9))
+                if DEBUG:
+                    debug("white pawn attack: {}".format(index - 9))
                 return True
 
         # check for knights
-        debug("checking for knights attacks", 2)
+        if DEBUG:
+            debug("checking for knights attacks", 2)
         rank_orign = index // 8
         rank_idx = [-2, -2, -1, -1, 1, 1, 2, 2]
         for j, i in enumerate([-17, -15, -10, -6, 6, 10, 15, 17]):
             rank = rank_orign + rank_idx[j]
             if check_boundary(index + i, rank):
                 if 0 <= index + i < 64 and board[index + i] == ("n" if side == "w" else "N"):
-                    debug("knight attack: {}".format(index + i))
+                    if DEBUG:
+                        debug("knight attack: {}".format(index + i))
                     return True
 
         # check for bishops and queens
-        debug("checking for bishops and queens attacks", 2)
-        for i in [-9, -7, 7, 9]:
+        if DEBUG:
+            debug("checking for bishops and queens attacks", 2)
+        for i in (-9, -7, 7, 9):
             rank = index // 8
             for j in range(1, 8):
                 if i < 0:
@@ -1519,21 +1575,25 @@ class Chess:
                 else:
                     rank += 1
                 if 0 <= index + i * j < 64 and check_boundary(index + i * j, rank):
-                    debug("checking bishop/queen attack: {}".format(index + i * j), 2)
+                    if DEBUG:
+                        debug("checking bishop/queen attack: {}".format(index + i * j), 2)
                     if board[index + i * j] == ("b" if side == "w" else "B") or board[index + i * j] == (
                         "q" if side == "w" else "Q"
                     ):
-                        debug("bishop/queen attack: {}".format(index + i * j))
+                        if DEBUG:
+                            debug("bishop/queen attack: {}".format(index + i * j))
                         return True
                     if board[index + i * j] != " ":
-                        debug("bishop/queen attack blocked: {}".format(index + i * j))
+                        if DEBUG:
+                            debug("bishop/queen attack blocked: {}".format(index + i * j))
                         break
                 else:
                     break
 
         # check for rooks and queens
-        debug("checking for rooks and queens attacks", 2)
-        for i in [-8, -1, 1, 8]:
+        if DEBUG:
+            debug("checking for rooks and queens attacks", 2)
+        for i in (-8, -1, 1, 8):
             rank = index // 8
             for j in range(1, 8):
                 if i == -8:
@@ -1541,26 +1601,32 @@ class Chess:
                 elif i == 8:
                     rank += 1
                 if 0 <= index + i * j < 64 and check_boundary(index + i * j, rank):
-                    debug("checking rook/queen attack: {}".format(index + i * j), 2)
+                    if DEBUG:
+                        debug("checking rook/queen attack: {}".format(index + i * j), 2)
                     if board[index + i * j] == ("r" if side == "w" else "R") or board[index + i * j] == (
                         "q" if side == "w" else "Q"
                     ):
-                        debug("rook/queen attack: {}".format(index + i * j))
+                        if DEBUG:
+                            debug("rook/queen attack: {}".format(index + i * j))
                         return True
                     if board[index + i * j] != " ":
-                        debug("rook/queen attack blocked: {}".format(index + i * j))
+                        if DEBUG:
+                            debug("rook/queen attack blocked: {}".format(index + i * j))
                         break
                 else:
                     break
 
         # check for kings
-        debug("checking for king attacks", 2)
-        for i in [-9, -8, -7, -1, 1, 7, 8, 9]:
+        if DEBUG:
+            debug("checking for king attacks", 2)
+        for i in (-9, -8, -7, -1, 1, 7, 8, 9):
             if 0 <= index + i < 64 and board[index + i] == ("k" if side == "w" else "K"):
-                debug("king attack: {}".format(index + i))
+                if DEBUG:
+                    debug("king attack: {}".format(index + i))
                 return True
 
-        debug("no attack")
+        if DEBUG:
+            debug("no attack")
         return False
 
     def remove_illegal_moves(self, moves: list):
@@ -1585,7 +1651,8 @@ class Chess:
 
         :return: True if the given move leaves the king of the given side in check
         """
-        debug("Checking if move {} leaves king in check".format(move))
+        if DEBUG:
+            debug("Checking if move {} leaves king in check".format(move))
 
         if move == "O-O" or move == "O-O-O":
             return False
@@ -1593,10 +1660,12 @@ class Chess:
         side = "w" if self.board[moved_piece].isupper() else "b"
         king_piece = "K" if side == "w" else "k"
 
-        previous_board = self.board.copy()
-        self.make_test_move(previous_board, move, side)
-        king_index = previous_board.index(king_piece)
-        return self.is_square_attacked(king_index, previous_board)
+        # Reuse one scratch board instead of copying the board for every candidate move
+        test_board = self.test_board
+        test_board[:] = self.board
+        self.make_test_move(test_board, move, side)
+        king_index = test_board.index(king_piece)
+        return self.is_square_attacked(king_index, test_board)
 
     def is_check(self, side: str):
         """
@@ -1606,7 +1675,8 @@ class Chess:
 
         :return: True if the given side is in check, False otherwise
         """
-        debug("Checking if {} is in check".format(side))
+        if DEBUG:
+            debug("Checking if {} is in check".format(side))
 
         king_piece = "K" if side == "w" else "k"
         king_index = self.board.index(king_piece)
@@ -1620,7 +1690,8 @@ class Chess:
 
         :return: True if the given side is in checkmate, False otherwise
         """
-        debug("Checking if {} is in checkmate".format(side))
+        if DEBUG:
+            debug("Checking if {} is in checkmate".format(side))
 
         if not self.is_check(side):
             return False
@@ -1636,11 +1707,13 @@ class Chess:
 
         :return: True if the given side is in stalemate, False otherwise
         """
-        debug("Checking if {} is in stalemate".format(side))
+        if DEBUG:
+            debug("Checking if {} is in stalemate".format(side))
 
         if self.is_check(side):
             return False
 
         moves = self.all_legal_moves(side, shortcut=True)
-        debug("moves: {}".format(moves))
+        if DEBUG:
+            debug("moves: {}".format(moves))
         return len(moves) == 0
@@ -19,6 +19,7 @@ class ChessClock:
     clock_running = False
     last_time = time.ticks_ms()  # time is tracked in milliseconds since start up
     prev_clock_text = "  00 :00"
+    prev_clock_tick = -1
 
     def __init__(self, i2c, i2c_mux: I2CMultiplex, mux_port: list):
         """
@@ -41,7 +42,8 @@ class ChessClock:
 
     def display_time(self, text, x=0, y=0, clear=True, align="L"):
         if clear:
-            self.clear()
+            # Cleared in the framebuffer only, the show() below flushes both at once
+            self.oled.fill(0)
         if align == "R":
             x = self.right_align(text, x)
         elif align == "C":
@@ -50,14 +52,30 @@ class ChessClock:
         self.fw.printstring(str(text))
         self.show()
 
-    def display_text(self, text, x=0, y=0, clear=True, align="L"):
+    def display_text(self, text, x=0, y=0, clear=True, align="L", show=True):
         if clear:
-            self.clear()
+            self.oled.fill(0)
         if align == "R":
             x = self.right_align(text, x, font_width=10)
         elif align == "C":
             x = self.center_align(text, x, font_width=10)
         self.oled.text(text, x, y)
+        if show:
+            self.show()
+
+    def display_lines(self, lines, x=0, y=0, line_height=10, clear=True):
+        """
+        :param lines: text lines drawn top to bottom, flushed to the OLED once
+        :param x: left edge of every line
+        :param y: top of the first line
+        :param line_height: vertical distance between lines in pixels
+        :param clear: clear the display before drawing
+        """
+        if clear:
+            self.oled.fill(0)
+        for text in lines:
+            self.oled.text(text, x, y)
+            y += line_height
         self.show()
 
     def clear(self):
@@ -98,6 +116,15 @@ class ChessClock:
             clock_text = "     00.0"
             self.display_time(clock_text, 0, 12, align="R", clear=False)
         else:
+            # The display shows whole seconds, or tenths in the last minute, so
+            # skip the formatting until that shown value changes
+            if self.clock_countdown < 60:
+                clock_tick = round(self.clock_countdown * 10)
+            else:
+                clock_tick = int(self.clock_countdown)
+            if clock_tick == self.prev_clock_tick:
+                return
+            self.prev_clock_tick = clock_tick
             ms = ((self.clock_countdown * 1000) % 1000) / 1000
             mins, secs = divmod(math.floor(self.clock_countdown), 60)
             if mins < 1:
@@ -31,7 +31,9 @@ board squares to indicate if the square is occupied by a piece.
 
 """
 import machine
+import micropython
 import uasyncio
+from micropython import const
 from io_expander import IOExpander
 
 RANK = ["1", "2", "3", "4", "5", "6", "7", "8"]
@@ -72,12 +74,39 @@ IO_EXPANDER_LIST = [
 IO_EXPANDER_MASK = [0xFFFF, 0xFFFF0000, 0xFFFF00000000, 0xFFFF000000000000]
 IO_EXPANDER_SHIFT = [0, 16, 32, 48]
 
-INVERSE_MASK = 0xFFFFFFFFFFFFFFFF
-STARTING_POSITION = 0xFFFF00000000FFFF
-CASTLING_WHITE_KING = 0x0000000000000060
-CASTLING_WHITE_QUEEN = 0x000000000000000C
-CASTLING_BLACK_KING = 0x6000000000000000
-CASTLING_BLACK_QUEEN = 0x0C00000000000000
+# Bitboard masks are const so uses in this module compile to constant loads
+STARTING_POSITION = const(0xFFFF00000000FFFF)
+CASTLING_WHITE_KING = const(0x0000000000000060)
+CASTLING_WHITE_QUEEN = const(0x000000000000000C)
+CASTLING_BLACK_KING = const(0x6000000000000000)
+CASTLING_BLACK_QUEEN = const(0x0C00000000000000)
+
+
+@micropython.viper
+def popcount32(x: uint) -> int:
+    """
+    Count the set bits of a 32-bit word using the SWAR algorithm
+
+    :param x: 32-bit word
+
+    :return: Number of set bits
+    """
+    x = x - ((x >> 1) & uint(0x55555555))
+    x = (x & uint(0x33333333)) + ((x >> 2) & uint(0x33333333))
+    x = (x + (x >> 4)) & uint(0x0F0F0F0F)
+    return int((x * uint(0x01010101)) >> 24)
+
+
+@micropython.native
+def popcount(bitboard: int) -> int:
+    """
+    Count the set bits of a 64-bit bitboard
+
+    :param bitboard: 64-bit bitboard
+
+    :return: Number of set bits
+    """
+    return popcount32(bitboard & 0xFFFFFFFF) + popcount32(bitboard >> 32)
 
 
 class Chessboard:
@@ -86,7 +115,9 @@ class Chessboard:
     bitboard = list(" " * 64)
     board_coords = {}
     board_coords_reverse = {}
+    bit_board_index = ()
     board_status = 0xFFFF00000000FFFF
+    piece_count = 32
     rgb_leds: machine.Pin
 
     def __init__(self, i2c: machine.I2C, address_list: list, rgb_leds: machine.Pin):
@@ -169,38 +200,52 @@ class Chessboard:
         """
         i = 0
         j = 0
-        for rank in RANK:
-            for file in FILE:
-                self.board_coords[file + rank] = (j, IO_EXPANDER_TILE[i])
-                reverse_index = IO_EXPANDER_TILE[i] << IO_EXPANDER_SHIFT[j]
+        bit_board_index = [0] * 64
+        for rank_index, rank in enumerate(RANK):
+            for file_index, file in enumerate(FILE):
+                tile = IO_EXPANDER_TILE[i]
+                self.board_coords[file + rank] = (j, tile)
+                reverse_index = tile << IO_EXPANDER_SHIFT[j]
                 self.board_coords_reverse[reverse_index] = file + rank
+                # MicroPython ints have no bit_length(), so find the tile's bit by shifting
+                bit = IO_EXPANDER_SHIFT[j]
+                while tile > 1:
+                    tile >>= 1
+                    bit += 1
+                bit_board_index[bit] = rank_index * 8 + file_index
                 i += 1
                 if i >= 16:
                     i = 0
                     j += 1
+        self.bit_board_index = tuple(bit_board_index)
 
+    @micropython.native
     def read_board(self):
         """
         Read the board state from the IO expanders
 
+        The piece count and the per-square bitboard are both filled from each
+        16-bit port read while it is still a small int, so neither needs to
+        shift the 64-bit board or look up square names.
+
         :return: None
         """
-        self.board_status = 0
+        board_status = 0
+        piece_count = 0
+        bitboard = self.bitboard
+        bit_board_index = self.bit_board_index
         for i, gpio in enumerate(self.io_expander):
             data = gpio.read_input_port()
             # print("IO Expander %d: %x" % (i, data))
-            shift_data = data << IO_EXPANDER_SHIFT[i]
-            self.board_status |= shift_data
-        for square in self.board_coords.keys():
-            data = (
-                self.board_status & IO_EXPANDER_MASK[self.board_coords[square][0]]
-            ) >> IO_EXPANDER_SHIFT[self.board_coords[square][0]]
-            board_idx = self.algebraic_to_board_index(square)
-            if data & self.board_coords[square][1]:
-                self.bitboard[board_idx] = 1
-            else:
-                self.bitboard[board_idx] = 0
-
+            piece_count += popcount32(data)
+            board_status |= data << IO_EXPANDER_SHIFT[i]
+            base = i * 16
+            for bit in range(16):
+                bitboard[bit_board_index[base + bit]] = (data >> bit) & 1
+        self.board_status = board_status
+        self.piece_count = piece_count
+
+    @micropython.native
     def delta_board_positions(
         self, previous_board_status: int, current_board_status: int = None
     ):
@@ -215,13 +260,7 @@ class Chessboard:
         if current_board_status is None:
             current_board_status = self.board_status
 
-        delta = previous_board_status ^ current_board_status
-
-        count = 0
-        while delta:
-            delta &= delta - 1
-            count += 1
-        return count
+        return popcount(previous_board_status ^ current_board_status)
 
     def print_board(self):
         """
@@ -268,6 +307,7 @@ class Chessboard:
         print()
         print("  ---------------------------------")
 
+    @micropython.native
     def convert_bitboard_to_int(self, bitboard: list = None) -> int:
         """
         Convert a bitboard to an integer
@@ -296,13 +336,21 @@ class Chessboard:
         """
         return self.board_status, self.board
 
+    def get_board_status(self):
+        """
+        Return the occupancy bitboard without building a tuple
+
+        :return: Integer bitboard of occupied squares
+        """
+        return self.board_status
+
     def count_pieces(self, current_board=None):
         """
         Count the number of pieces on the board
         """
         if current_board is None:
             current_board = self.board_status
-        return str(bin(current_board)).count("1")
+        return popcount(current_board)
 
     def update_board_move(self, move: tuple):
         """
@@ -421,6 +469,7 @@ class Chessboard:
                 return True
         return False
 
+    @micropython.native
     def detect_move_positions(self, prev_state, new_state):
         """
         Deduce the positions of a piece moved from old position to new position
@@ -431,11 +480,10 @@ class Chessboard:
 
         :return: Tuple of old and new positions
         """
-        new_pos_coord = new_state & (prev_state ^ INVERSE_MASK)
-        old_pos_coord = prev_state & (new_state ^ INVERSE_MASK)
+        delta = prev_state ^ new_state
 
-        new_pos = self.coord_to_algebraic(new_pos_coord)
-        old_pos = self.coord_to_algebraic(old_pos_coord)
+        new_pos = self.coord_to_algebraic(new_state & delta)
+        old_pos = self.coord_to_algebraic(prev_state & delta)
 
         return old_pos, new_pos
 
@@ -489,6 +537,7 @@ class Chessboard:
             else:
                 return "e8", "c8"
 
+    @micropython.native
     def detect_capture_move_positions(
         self, prev_state, capturing_state, captured_state
     ):
@@ -501,14 +550,15 @@ class Chessboard:
 
         :return: Tuple of old position and captured position (algebraic notation)
         """
-        capturing_piece = prev_state & (capturing_state ^ INVERSE_MASK)
-        captured_piece = capturing_state & (captured_state ^ INVERSE_MASK)
+        capturing_piece = prev_state & (prev_state ^ capturing_state)
+        captured_piece = capturing_state & (capturing_state ^ captured_state)
 
         capturing = self.coord_to_algebraic(capturing_piece)
         captured = self.coord_to_algebraic(captured_piece)
 
         return capturing, captured
 
+    @micropython.native
     def coord_to_algebraic(self, coord):
         """
         Translate a coordinate to algebraic notation
@@ -516,8 +566,9 @@ class Chessboard:
         :param coord: Coordinate to translate
         :return: Algebraic notation
         """
-        if coord in self.board_coords_reverse.keys():
-            return self.board_coords_reverse[coord]
+        square = self.board_coords_reverse.get(coord)
+        if square is not None:
+            return square
         else:
             print("Invalid coordinate: %x" % coord)
 
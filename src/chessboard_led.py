@@ -16,6 +16,7 @@ https://cdn-shop.adafruit.com/datasheets/WS2812B.pdf
 
 The class provides the following methods:
     - __init__: initialize the LED driver chip
+    - write: push the pixel buffer to the LED matrix if it changed
     - clear_board: clear the LED matrix
     - show_occupied_squares: show the occupied squares on the LED matrix
     - show_unoccupied_squares: show the unoccupied squares on the LED matrix
@@ -26,6 +27,7 @@ The class provides the following methods:
 from neopixel import NeoPixel
 import chess
 import machine
+import micropython
 from chessboard import Chessboard
 import uasyncio
 
@@ -64,6 +66,7 @@ class ChessboardLED:
     min_brightness = 10
     led_count = 64
     lux = 0
+    last_frame = None
 
     def __init__(
         self,
@@ -85,6 +88,11 @@ class ChessboardLED:
         if driver is None:
             self.driver = NeoPixel(led_io, self.led_count)
 
+        # Preallocated copy of the last frame pushed, so write() compares and
+        # copies in place. It starts all-white, which adjust_brightness never
+        # produces, so the first frame always goes out.
+        self.last_frame = bytearray(b"\xff" * len(self.driver.buf))
+
         if vls_io is None:
             raise Exception("vls_io parameter is required")
 
@@ -149,6 +157,19 @@ class ChessboardLED:
 
         return adj_color
 
+    def write(self):
+        """
+        Push the pixel buffer to the LED matrix, skipping the transfer when
+        the frame is the same as the one last pushed
+
+        :return: None
+        """
+        buf = self.driver.buf
+        if buf == self.last_frame:
+            return
+        self.driver.write()
+        self.last_frame[:] = buf
+
     def clear_board(self):
         """
         Clear the LED matrix
@@ -156,7 +177,7 @@ class ChessboardLED:
         :return: None
         """
         self.driver.fill((0, 0, 0))
-        self.driver.write()
+        self.write()
 
     def show_occupied_squares(self, board: Chessboard):
         """
@@ -166,11 +187,13 @@ class ChessboardLED:
 
         :return: None
         """
-        self.driver.fill((0, 0, 0))
+        driver = self.driver
+        color = self.adjust_brightness((0, 0, 32))
+        driver.fill((0, 0, 0))
         for i, occupied in enumerate(board.bitboard):
             if occupied:
-                self.driver[i] = self.adjust_brightness((0, 0, 32))
-        self.driver.write()
+                driver[i] = color
+        self.write()
 
     def show_unoccupied_squares(self, board: Chessboard):
         """
@@ -180,11 +203,13 @@ class ChessboardLED:
 
         :return: None
         """
-        self.driver.fill((0, 0, 0))
+        driver = self.driver
+        color = self.adjust_brightness((32, 0, 0))
+        driver.fill((0, 0, 0))
         for i, occupied in enumerate(board.bitboard):
             if not occupied:
-                self.driver[i] = self.adjust_brightness((32, 0, 0))
-        self.driver.write()
+                driver[i] = color
+        self.write()
 
     def show_checkmate(self, side: str):
         """
@@ -194,20 +219,16 @@ class ChessboardLED:
 
         :return: None
         """
-        self.driver.fill((0, 0, 0))
+        driver = self.driver
+        red = self.adjust_brightness((100, 0, 0))
+        green = self.adjust_brightness((0, 48, 0))
         for i in range(64):
             if i < 32:
-                if side == "w":
-                    self.driver[i] = self.adjust_brightness((100, 0, 0))
-                else:
-                    self.driver[i] = self.adjust_brightness((0, 48, 0))
+                driver[i] = red if side == "w" else green
             else:
-                if side == "b":
-                    self.driver[i] = self.adjust_brightness((100, 0, 0))
-                else:
-                    self.driver[i] = self.adjust_brightness((0, 48, 0))
+                driver[i] = red if side == "b" else green
 
-        self.driver.write()
+        self.write()
 
     def show_stalemate(self):
         """
@@ -215,20 +236,16 @@ class ChessboardLED:
 
         :return: None
         """
-        self.driver.fill((0, 0, 0))
+        driver = self.driver
+        blue = self.adjust_brightness((0, 0, 48))
+        green = self.adjust_brightness((0, 48, 0))
         for i in range(64):
             if i % 8 < 4:
-                if i // 8 < 4:
-                    self.driver[i] = self.adjust_brightness((0, 0, 48))
-                else:
-                    self.driver[i] = self.adjust_brightness((0, 48, 0))
+                driver[i] = blue if i // 8 < 4 else green
             else:
-                if i // 8 < 4:
-                    self.driver[i] = self.adjust_brightness((0, 48, 0))
-                else:
-                    self.driver[i] = self.adjust_brightness((0, 0, 48))
+                driver[i] = green if i // 8 < 4 else blue
 
-        self.driver.write()
+        self.write()
 
     def show_setup_squares(self, board: Chessboard):
         """
@@ -238,13 +255,13 @@ class ChessboardLED:
 
         :return: None
         """
-        self.driver.fill((0, 0, 0))
-        mask = []
+        driver = self.driver
+        color = self.adjust_brightness((128, 0, 8))
+        driver.fill((0, 0, 0))
         for i, occupied in enumerate(board.bitboard):
-            if not occupied and i // 8 in [0, 1, 6, 7]:
-                mask.append(i)
-                self.driver[i] = self.adjust_brightness((128, 0, 8))
-        self.driver.write()
+            if not occupied and i // 8 in (0, 1, 6, 7):
+                driver[i] = color
+        self.write()
 
     def show_bitboard_squares(self, bitboard: int, color: tuple = (0, 0, 32)):
         """
@@ -256,10 +273,8 @@ class ChessboardLED:
         :return: None
         """
         self.driver.fill((0, 0, 0))
-        for i in range(64):
-            if bitboard & (1 << i):
-                self.driver[i] = self.adjust_brightness(color)
-        self.driver.write()
+        self.prepare_bitboard_square(bitboard, color)
+        self.write()
 
     def zero_bitboard_squares(self):
         """
@@ -275,14 +290,24 @@ class ChessboardLED:
         """
         Prepare the bitboard squares on the LED matrix
 
+        Only the pixel buffer is updated; display_bitboard_squares() pushes it.
+        The bitboard is walked a rank at a time like paint_diff, so the tests
+        stay on small ints and empty ranks are skipped.
+
         :param bitboard: bitboard
         :param color: color of the LED
 
         :return: None
         """
-        for i in range(64):
-            if bitboard & (1 << i):
-                self.driver[i] = self.adjust_brightness(color)
+        driver = self.driver
+        color = self.adjust_brightness(color)
+        for rank in range(8):
+            shift = rank * 8
+            rank_bits = (bitboard >> shift) & 0xFF
+            if rank_bits:
+                for file in range(8):
+                    if rank_bits & (1 << file):
+                        driver[shift + file] = color
 
     def display_bitboard_squares(self):
         """
@@ -290,7 +315,48 @@ class ChessboardLED:
 
         :return: None
         """
-        self.driver.write()
+        self.write()
+
+    @micropython.native
+    def paint_diff(
+        self,
+        in_bitboard: int,
+        out_bitboard: int,
+        in_color: tuple = (0, 48, 0),
+        out_color: tuple = (58, 0, 0),
+    ):
+        """
+        Show squares that are in and out of position in one pass
+
+        The colors are brightness adjusted once, and the bitboards are walked
+        a rank at a time so the per-square tests stay on small ints. This is
+        native rather than viper because a 64-bit bitboard does not fit the
+        ESP32's 32-bit viper word.
+
+        :param in_bitboard: bitboard of squares in position
+        :param out_bitboard: bitboard of squares out of position
+        :param in_color: color of the squares in position
+        :param out_color: color of the squares out of position
+
+        :return: None
+        """
+        driver = self.driver
+        in_color = self.adjust_brightness(in_color)
+        out_color = self.adjust_brightness(out_color)
+        off = (0, 0, 0)
+        for rank in range(8):
+            shift = rank * 8
+            in_rank = (in_bitboard >> shift) & 0xFF
+            out_rank = (out_bitboard >> shift) & 0xFF
+            for file in range(8):
+                bit = 1 << file
+                if in_rank & bit:
+                    driver[shift + file] = in_color
+                elif out_rank & bit:
+                    driver[shift + file] = out_color
+                else:
+                    driver[shift + file] = off
+        self.write()
 
     def show_cpu_remote_move(self, move: str, side: str):
         """
@@ -341,7 +407,7 @@ class ChessboardLED:
                 self.driver[58] = self.adjust_brightness((155, 65, 0))
                 self.driver[56] = self.adjust_brightness((0, 0, 18))
 
-        self.driver.write()
+        self.write()
 
     def show_interim_move(self, move: str, side: str):
         """
@@ -396,7 +462,7 @@ class ChessboardLED:
                 self.driver[58] = self.adjust_brightness((155, 65, 0))
                 self.driver[56] = self.adjust_brightness((0, 0, 18))
 
-        self.driver.write()
+        self.write()
 
     def show_illegal_piece_lifted(self, origin: str, board: chess.Chess):
         if origin is None:
@@ -408,7 +474,7 @@ class ChessboardLED:
 
         self.driver.fill((64, 0, 0))
         self.driver[origin_square] = self.adjust_brightness((0, 0, 64))
-        self.driver.write()
+        self.write()
         return
 
     def show_legal_moves(self, origin: str, legal_moves: list, board: chess.Chess):
@@ -432,13 +498,17 @@ class ChessboardLED:
         if side != board.turn:
             self.driver.fill((64, 0, 0))
             self.driver[origin_square] = self.adjust_brightness((0, 0, 64))
-            self.driver.write()
+            self.write()
             return
 
-        self.driver.fill((0, 0, 0))
-        self.driver[origin_square] = self.adjust_brightness((0, 0, 64))
+        driver = self.driver
+        driver.fill((0, 0, 0))
+        driver[origin_square] = self.adjust_brightness((0, 0, 64))
+        move_color = self.adjust_brightness((0, 32, 0))
+        capture_color = self.adjust_brightness((100, 0, 0))
+        promotion_color = self.adjust_brightness((0, 100, 100))
 
-        for i, move in enumerate(legal_moves):
+        for move in legal_moves:
             (
                 from_square,
                 to_square,
@@ -449,24 +519,18 @@ class ChessboardLED:
             ) = chess.parse_move_notation(move)
             if castle:
                 if castle in "Kk":
-                    if side == "b":
-                        self.driver[62] = self.adjust_brightness((0, 32, 0))
-                    else:
-                        self.driver[6] = self.adjust_brightness((0, 32, 0))
+                    driver[62 if side == "b" else 6] = move_color
                 elif castle in "Qq":
-                    if side == "b":
-                        self.driver[58] = self.adjust_brightness((0, 32, 0))
-                    else:
-                        self.driver[2] = self.adjust_brightness((0, 32, 0))
+                    driver[58 if side == "b" else 2] = move_color
             else:
                 index = chess.algebraic_to_board_index(to_square)
                 if capture:
-                    self.driver[index] = self.adjust_brightness((100, 0, 0))
+                    driver[index] = capture_color
                 elif promotion:
-                    self.driver[index] = self.adjust_brightness((0, 100, 100))
+                    driver[index] = promotion_color
                 else:
-                    self.driver[index] = self.adjust_brightness((0, 32, 0))
-        self.driver.write()
+                    driver[index] = move_color
+        self.write()
 
     async def wagtag(self, period_ms=100):
         """
@@ -478,25 +542,20 @@ class ChessboardLED:
         """
 
         self.driver.fill((0, 0, 0))
-        self.driver.write()
+        self.write()
 
         ticks = 0
         pixel = 64
 
         while True:
+            self.driver.fill((0, 0, 0))
             if ticks % 2 == 0:
-                self.driver.fill((0, 0, 0))
-                self.driver.write()
-                await uasyncio.sleep_ms(50)
                 for i in range(0, int(pixel / 2)):
                     self.driver[i] = self.adjust_brightness((0, 0, 64))
             else:
-                self.driver.fill((0, 0, 0))
-                self.driver.write()
-                await uasyncio.sleep_ms(50)
                 for i in range(int(pixel / 2), int(pixel)):
                     self.driver[i] = self.adjust_brightness((64, 0, 0))
-            self.driver.write()
+            self.write()
             ticks += 1
             await uasyncio.sleep_ms(period_ms)
 
@@ -536,7 +595,7 @@ class ChessboardLED:
                 self.max_brightness,
                 self.max_brightness,
             )
-            self.driver.write()
+            self.write()
             await uasyncio.sleep_ms(25)
 
         # bounce
@@ -558,7 +617,7 @@ class ChessboardLED:
                 self.driver[i % n] = (0, 0, 0)
             else:
                 self.driver[n - 1 - (i % n)] = (0, 0, 0)
-            self.driver.write()
+            self.write()
             await uasyncio.sleep_ms(60)
 
         await console("Done\\rRunning Fade in/out...")
@@ -570,7 +629,7 @@ class ChessboardLED:
                 else:
                     val = 255 - (i & 0xFF)
                 self.driver[j] = (val, 0, 0)
-            self.driver.write()
+            self.write()
 
         # rainbow
         await console("Done\\rRunning Rainbow...")
@@ -578,12 +637,12 @@ class ChessboardLED:
             for i in range(n):
                 pixel_index = (i * self.max_brightness // n) + j
                 self.driver[i] = self.wheel(pixel_index & self.max_brightness)
-            self.driver.write()
+            self.write()
             await uasyncio.sleep_ms(20)
 
         await console("Done\\rClearing LED matrix...")
         # clear the LED matrix
         self.driver.fill((0, 0, 0))
-        self.driver.write()
+        self.write()
 
         await console("Done\\rAddressable LED matrix test complete")
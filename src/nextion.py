@@ -5,8 +5,12 @@ import uasyncio
 import ubinascii
 import struct
 
+from micropython import const
 from primitives.queue import Queue
 
+# Debug output (0 = off)
+DEBUG = const(0)
+
 # Event Types
 TOUCH = 0x65  # Touch event
 TOUCH_COORDINATE = 0x67  # Touch coordinate
@@ -95,19 +99,36 @@ class Nextion:
         else:
             raise Exception("queue is not primitives.queue object")
 
-    async def flush_buffer(self):
-        if self.uart.any() > 0:
-            buffer = self.uart.read()
-            msg = buffer.split(EOL)
-            for i, row in enumerate(msg):
-                if len(row):
-                    self.queue.put_nowait(row + EOL)
+    def flush_buffer(self):
+        """
+        Move any complete Nextion packets from the UART into the event queue.
+        Does not yield, so it runs atomically with respect to other coroutines.
+        Called every event loop tick, so the idle path is a single uart.any().
+        Packets are queued without the EOL terminator, so each one is queued
+        as the slice split() already produced instead of a re-joined copy.
+        """
+        if self.uart.any():
+            put = self.queue.put_nowait
+            for row in self.uart.read().split(EOL):
+                if row:
+                    put(row)
 
     async def clear_console(self, page="test_monitor"):
         self.console_buffer = []
         variable_name = "%s.console.txt" % page
         await self.set_value(variable_name, "")
 
+    def clear_console_command(self, page="test_monitor"):
+        """
+        Reset the console buffer and return the command that clears the console,
+        so the clear can go out in the same send_batch write as a page change
+
+        :param page: Nextion page holding the console
+        :return: command string
+        """
+        self.console_buffer = []
+        return '%s.console.txt=""' % page
+
     async def clear_analysis(self, page="test_monitor"):
         variable_name = "%s.analysis.txt" % page
         await self.set_value(variable_name, "")
@@ -146,33 +167,71 @@ class Nextion:
         if len(console_buffer) > buffer_size:
             console_buffer = console_buffer[-buffer_size:]
 
-        print("Printing to console: %s" % s)
+        if DEBUG:
+            print("Printing to console: %s" % s)
         variable_name = "%s.%s.txt" % (page, txt_name)
         await self.set_value(variable_name, console_buffer)
 
     async def send_command(self, command):
-        prepare_command = b"%s" % command + EOL
         await self.lock.acquire()
-        await self.flush_buffer()
-        print("Command executed: %s" % command)
-        self.uart.write(prepare_command)
+        self.flush_buffer()
+        if DEBUG:
+            print("Command executed: %s" % command)
+        # Both land in the UART transmit buffer, so writing the command string and
+        # the terminator separately saves building a bytes copy of every command
+        self.uart.write(command)
+        self.uart.write(EOL)
         response = None
         a = 0
         while a < 3:
             await uasyncio.sleep_ms(100)
             if self.uart.any() > 0:
                 response = self.uart.read()
-                print("command response: %s " % response)
+                if DEBUG:
+                    print("command response: %s " % response)
                 break
             a += 1
         self.lock.release()
 
         return response
 
+    async def send_batch(self, commands):
+        """
+        Send several commands in a single UART write and collect their replies
+
+        With bkcmd=3 the Nextion acknowledges every command, so keep reading
+        until one reply per command has arrived rather than leaving the
+        remaining acknowledgements to be queued as events.
+
+        :param commands: list of command strings, sent in order
+        :return: raw response bytes, or None if the Nextion stayed silent
+        """
+        prepare_command = EOL.join(b"%s" % command for command in commands) + EOL
+        await self.lock.acquire()
+        self.flush_buffer()
+        if DEBUG:
+            print("Batch executed: %s" % commands)
+        self.uart.write(prepare_command)
+        response = b""
+        a = 0
+        while a < 3 and response.count(EOL) < len(commands):
+            await uasyncio.sleep_ms(100)
+            if self.uart.any() > 0:
+                response += self.uart.read()
+            else:
+                a += 1
+        self.lock.release()
+        if DEBUG:
+            print("batch response: %s " % response)
+
+        if not response:
+            response = None
+        return response
+
     async def get_value(self, key):
         prepare_command = b"get %s" % key + EOL
         await self.lock.acquire()
-        await self.flush_buffer()
+        self.flush_buffer()
         self.uart.write(prepare_command)
         response = None
         value = None
@@ -181,7 +240,8 @@ class Nextion:
             await uasyncio.sleep_ms(100)
             if self.uart.any() > 0:
                 response = self.uart.read()
-                print(response)
+                if DEBUG:
+                    print(response)
                 break
             a += 1
         self.lock.release()
@@ -193,24 +253,32 @@ class Nextion:
             if typ == INVALID_VARIABLE:
                 raise AssertionError("Invalid variable: %s" % key)
             elif typ == NUMBER and len(response) == PACKET_LENGTH_MAP[typ]:
-                print("got number response")
+                if DEBUG:
+                    print("got number response")
                 value = struct.unpack("i", raw)[0]
             elif typ == STRING:
-                print("got string response")
+                if DEBUG:
+                    print("got string response")
                 value = raw.decode("iso-8859-1")
             elif typ == PAGE:
-                print("got page response")
+                if DEBUG:
+                    print("got page response")
                 value = raw[1]
             else:
                 print("got unknown data: %s", ubinascii.hexlify(response))
 
-            print("%s: %s" % (key, response))
+            if DEBUG:
+                print("%s: %s" % (key, response))
         return value
 
     async def set_value(self, key, value):
-        print("value type: %s" % type(value))
+        if DEBUG:
+            print("value type: %s" % type(value))
         if isinstance(value, str):
-            out_value = bytearray(b'"' + rawbytes(value) + b'"')
+            out_value = b'"' + rawbytes(value) + b'"'
+        elif isinstance(value, (bytes, bytearray)):
+            # Already encoded by the caller, skip the per-character rawbytes pass
+            out_value = b'"' + value + b'"'
         elif isinstance(value, float):
             print("Float is not supported. Converting to string")
             out_value = '"%s"' % str(value)
@@ -221,9 +289,13 @@ class Nextion:
                 'value type "%s" is not supported for set' % type(value).__name__
             )
 
-        prepare_command = bytearray(key.encode("iso-8859-1") + b"=") + out_value + EOL
+        # Build the command in place instead of concatenating a new buffer per part
+        prepare_command = bytearray(key.encode("iso-8859-1"))
+        prepare_command += b"="
+        prepare_command += out_value
+        prepare_command += EOL
         await self.lock.acquire()
-        await self.flush_buffer()
+        self.flush_buffer()
         self.uart.write(prepare_command)
         response = None
         status = None
@@ -232,14 +304,16 @@ class Nextion:
             await uasyncio.sleep_ms(100)
             if self.uart.any() > 0:
                 response = self.uart.read()
-                print("set_value response: %s" % response)
+                if DEBUG:
+                    print("set_value response: %s" % response)
                 break
             a += 1
         self.lock.release()
 
         if response is None:
             status = SUCCESS
-            print("%s success" % prepare_command)
+            if DEBUG:
+                print("%s success" % prepare_command)
         else:
             status = response[0]
             raw = response[1:]
@@ -249,9 +323,9 @@ class Nextion:
         return status
 
     async def parse_event(self, event_packet):
+        # event_packet comes from flush_buffer with the EOL terminator stripped
         event_type = event_packet[0]
-        end = len(event_packet) - 3
-        raw = event_packet[1:end]
+        raw = event_packet[1:]
         data = None
 
         if event_type == TOUCH:  # Touch event
@@ -24,6 +24,17 @@ try:
 except ImportError:
     import asyncio
 
+try:
+    from micropython import const
+except ImportError:
+
+    def const(x):
+        return x
+
+
+# Debug output for the per-search engine traffic (0 = off)
+DEBUG = const(0)
+
 
 def map_range(x, in_min, in_max, out_min, out_max):
     return (x - in_min) * (out_max - out_min) // (in_max - in_min) + out_min
@@ -179,7 +190,8 @@ class UCI:
 
         # Send the "position" command to the chess engine.
         self.writer.write(b"position fen %s\n" % fen.encode())
-        print("Sent: position fen %s" % fen)
+        if DEBUG:
+            print("Sent: position fen %s" % fen)
 
         # Send the "go" command to the chess engine.
         self.writer.write(b"go depth %d movetime %d\n" % (depth, movetime))
@@ -198,10 +210,13 @@ class UCI:
                         self.reader.readline(), timeout=timeout
                     )
                     clean_response = response.decode().strip()
-                    print("Received: %s" % clean_response)
+                    if DEBUG:
+                        print("Received: %s" % clean_response)
                 except asyncio.TimeoutError:
                     clean_response = None
                 if clean_response:
+                    # Only consecutive silent reads point at a dead connection
+                    self.no_response_counter = 0
                     for word in match_string:
                         if clean_response.startswith(word):
                             return clean_response
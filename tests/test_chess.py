@@ -404,6 +404,49 @@ def test_legal_bishop_moves():
         )
 
 
+def test_legal_moves_cache():
+    board.set_fen("4k3/8/8/8/8/8/8/R3K3 w - - 0 1")
+    index = chess.algebraic_to_board_index("a1")
+    moves = board.get_legal_moves(index)
+    with check:
+        assert board.get_legal_moves(index) is moves
+        assert "a1-a8" in moves
+        assert "a1-h1" not in moves
+
+    board.make_move("e1-e2")
+    with check:
+        assert "a1-h1" in board.get_legal_moves(index)
+
+    board.set_fen("4k3/8/8/8/8/8/8/R3K3 w - - 0 1")
+    board[chess.algebraic_to_board_index("a5")] = "p"
+    with check:
+        assert "a1-a8" not in board.get_legal_moves(index)
+        assert "a1xa5" in board.get_legal_moves(index)
+
+
+def test_legal_moves_cache_reset():
+    index = chess.algebraic_to_board_index("a1")
+
+    board.set_fen("4k3/8/8/8/8/8/8/R3K3 w - - 0 1")
+    board.get_legal_moves(index)
+    board[chess.algebraic_to_board_index("a5")] = "p"
+    with check:
+        assert board.legal_moves_cache == {}
+        assert board.legal_moves_cache is not chess.Chess.legal_moves_cache
+
+    board.get_legal_moves(index)
+    board.set_fen("4k3/8/8/8/8/8/8/R3K3 w - - 0 1")
+    with check:
+        assert board.legal_moves_cache == {}
+        assert board.legal_moves_cache is not chess.Chess.legal_moves_cache
+
+    board.get_legal_moves(index)
+    board.update_turn("a1-a2")
+    with check:
+        assert board.legal_moves_cache == {}
+        assert board.legal_moves_cache is not chess.Chess.legal_moves_cache
+
+
 def test_enpassant_moves():
     board.set_fen("6k1/8/8/8/5Pp1/8/8/4K1R1 b - f3 0 1")
     index = chess.algebraic_to_board_index("g4")